@@ -4,7 +4,6 @@ import networkx as nx
 from multiprocessing import Pool
 from itertools import combinations
 
-import classes.importer as importer
 from methods.get_graphs import create_graph_from_game
 
 
@@ -90,41 +89,20 @@ def frequent_subgraph_mining(games, rule, minimum_support):
     Using multiprocessing to speed up the process.
     """
     
-    games_satisfying_rules = []
-    
-    data = importer.get_graphs_files()[1]
-    
-    graphs = importer.get_graphs()
-
-    nb_time_frames = max([len(game['time_frames']) for game in graphs])
-
-    def __verify_rule(data, path):
-        for node in path:
-            if node[1] == 'leaf':
-                if node[0].label != data["class"]:
-                    return False
-            elif node[1] == '<=':
-                if data[node[0].label] > node[0].threshold:
-                    return False
-            elif node[1] == '>':
-                if data[node[0].label] <= node[0].threshold:
-                    return False
-        return True
-    
     condition_nodes = []
     for node in rule['path'][:-1]:
         _, player, frame = re.search(r'([a-z]+) of ([a-zA-z0-9-]+) in time frame ([0-9]+)', node[0].label).groups()
         condition_nodes.append((player, frame))
 
-    for saved_matrics, game in zip(data, games):
-        if __verify_rule(saved_matrics, rule['path']):
-            games_satisfying_rules.append((game, saved_matrics))
+    games_satisfying_rules = [games[row] for row in rule['rows']]
+
+    nb_time_frames = max([len(game.time_frames) for game in games])
 
     args = []
     
     for time_frame in range(nb_time_frames):
         condition_nodes_in_frame = [node for node in condition_nodes if node[1] == str(time_frame)]
-        graphs = [create_graph_from_game(game, time_frame) for game, _ in games_satisfying_rules]
+        graphs = [create_graph_from_game(game, time_frame) for game in games_satisfying_rules]
         args.append((graphs, minimum_support*len(games_satisfying_rules), condition_nodes_in_frame))
 
     processes = 12
@@ -1,106 +1,396 @@
-import math
+import json
+import time
 import random
+import numpy as np
+from multiprocessing import Pool
+from statistics import NormalDist
+
+# Read-only columns shared with the cross validation workers
+_cross_validation_columns = None
 
 
 class Node:
     """
     A class to represent a node in a decision tree.
     """
-    def __init__(self, is_leaf: bool, label: str, threshold: float) -> None:
+    def __init__(self, is_leaf: bool, label: str, threshold: float, counts=None) -> None:
         self.label = label
         self.threshold = threshold
         self.is_leaf = is_leaf
+        self.counts = counts
         self.children = []
 
 
 class C45:
     """
     A class to represent a C4.5 decision tree.
+    The splitter is either 'sort', which sorts the rows of every node, 'presorted', which sorts
+    every feature once at the root and hands stable partitions of those orders down to the children,
+    or 'histogram', an approximate mode which cuts every feature into at most max_bins bins and
+    searches splits on per-bin class histograms.
+    The data is a list of dicts, or None for a tree trained directly on a feature matrix with generate_tree_from_matrix.
+    The growth stops at max_depth, below min_samples_split rows, or when the best gain is under min_gain.
+    With a pruning_confidence, the grown tree is pruned with C4.5's pessimistic error estimate.
     """
-    def __init__(self, data, classes: list[str], features: list[str]) -> None:
+    def __init__(self, data, classes: list[str], features: list[str], splitter: str = 'sort', max_bins: int = 255,
+                 max_depth: int = None, min_samples_split: int = 2, min_gain: float = None, pruning_confidence: float = None) -> None:
+        if splitter not in ['sort', 'presorted', 'histogram']:
+            raise ValueError(f'Unknown splitter: {splitter}')
+
         self.data = data
         self.classes = classes
         self.features = features
+        self.splitter = splitter
+        self.max_bins = max_bins
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_gain = min_gain
+        self.pruning_confidence = pruning_confidence
 
+        self.matrix = None
+        self.labels = None
+        self.codes = None
+        self.bin_thresholds = None
         self.tree = None
 
-    def get_majority_class(self, data) -> str:
+        # Compiled tree, as parallel arrays indexed by node
+        self.nodes = []
+        self.node_feature = None
+        self.node_threshold = None
+        self.node_left = None
+        self.node_right = None
+        self.node_parent = None
+        self.node_class = None
+
+    def to_columns(self, data):
+        """
+        Returns the feature matrix and the class vector of the data.
+        """
+
+        class_index = {c: i for i, c in enumerate(self.classes)}
+        matrix = np.array([[e[feature] for feature in self.features] for e in data], dtype=float).reshape(len(data), len(self.features))
+        labels = np.array([class_index[e["class"]] for e in data], dtype=int)
+
+        return matrix, labels
+
+    def columns(self):
+        """
+        Returns the feature matrix and the class vector of the tree's data, its training columns when it has no data.
+        """
+
+        if self.data is None:
+            return self.matrix, self.labels
+
+        return self.to_columns(self.data)
+
+    def class_counts(self, indices):
+        """
+        Returns the number of occurrences of each class in the rows.
+        """
+
+        return np.bincount(self.labels[indices], minlength=len(self.classes))
+
+    def get_majority_class(self, indices) -> str:
         """
-        Returns the class that appears the most in the data.
+        Returns the class that appears the most in the rows.
         """
 
-        return max(set([e["class"] for e in data]), key=[e["class"] for e in data].count)
+        return self.classes[np.argmax(self.class_counts(indices))]
     
-    def split_attribute(self, data, features: list[str]):
+    def split_attribute(self, indices, features: list[int], orders=None):
         """
-        Splits the data on the best attribute and threshold.
+        Splits the rows on the best attribute and threshold.
+        With presorted orders, each column of orders holds the rows sorted by that feature.
+        Returns the best feature, threshold and gain, and the children as (indices, orders) pairs.
         """
 
-        splitted_data = []
-        best_feature: str
+        parent_counts = self.class_counts(indices)
+        best_feature: int
         best_threshold: float
         max_gain = -1
 
         for feature in features:
-            sorted_data = sorted(data, key=lambda x: x[feature])
-            for i in range(len(sorted_data) - 1):
-                threshold = (sorted_data[i][feature] + sorted_data[i + 1][feature]) / 2
-                left = [e for e in sorted_data if e[feature] <= threshold]
-                right = [e for e in sorted_data if e[feature] > threshold]
-                gain = self.gain(data, left, right)
-                if gain > max_gain:
-                    max_gain = gain
-                    splitted_data = [left, right]
-                    best_feature = feature
-                    best_threshold = threshold
-                    
-        return best_feature, best_threshold, [subset for subset in splitted_data if subset]
+            if orders is None:
+                order = indices[np.argsort(self.matrix[indices, feature], kind='stable')]
+            else:
+                order = orders[:, feature]
+            gain, threshold = self.best_threshold(self.matrix[order, feature], self.labels[order], parent_counts)
+            if gain > max_gain:
+                max_gain = gain
+                best_feature = feature
+                best_threshold = threshold
+
+        mask = self.matrix[indices, best_feature] <= best_threshold
+        splitted_data = [(indices[mask], None), (indices[~mask], None)]
+
+        if orders is not None:
+            in_left = np.zeros(len(self.labels), dtype=bool)
+            in_left[indices[mask]] = True
+            columns = orders.T
+            left = columns[in_left[columns]].reshape(len(self.features), -1).T
+            right = columns[~in_left[columns]].reshape(len(self.features), -1).T
+            splitted_data = [(indices[mask], left), (indices[~mask], right)]
+
+        return best_feature, best_threshold, max_gain, [subset for subset in splitted_data if len(subset[0])]
+
+    def best_threshold(self, values, labels, parent_counts):
+        """
+        Returns the best information gain and threshold of a sorted column.
+        """
+
+        # A constant feature can only put everything on the left, like the exhaustive scan did
+        run_ends = np.append(np.flatnonzero(values[1:] != values[:-1]), len(values) - 1)
+        if len(run_ends) == 1:
+            return 0.0, float(values[0])
+
+        run_counts = np.diff(np.cumsum(np.eye(len(self.classes), dtype=int)[labels], axis=0)[run_ends], axis=0, prepend=0)
+        gain, run = self.best_cut(run_counts, parent_counts)
+        if run is None:
+            return gain, None
+
+        # Inside a run of equal values, the exhaustive scan first met the value itself as threshold
+        if run_counts[run].sum() > 1:
+            threshold = values[run_ends[run]]
+        else:
+            threshold = (values[run_ends[run]] + values[run_ends[run] + 1]) / 2
+
+        return gain, float(threshold)
+
+    def best_cut(self, run_counts, parent_counts):
+        """
+        Returns the best information gain and the run after which to cut, from the class counts of consecutive runs of values.
+        The runs are scanned with running class counts, only testing the boundaries where the class changes.
+        """
+
+        left_counts = np.cumsum(run_counts, axis=0)
+        pure = np.count_nonzero(run_counts, axis=1) == 1
+        run_class = np.argmax(run_counts, axis=1)
+        candidates = np.flatnonzero(~(pure[:-1] & pure[1:] & (run_class[:-1] == run_class[1:])))
+        if len(candidates) == 0:
+            return -1, None
+
+        gains = self.gain(parent_counts, left_counts[candidates], parent_counts - left_counts[candidates])
+        best = np.argmax(gains)
+
+        return gains[best], candidates[best]
+
+    def feature_gains(self, matrix, labels):
+        """
+        Returns the best information gain of a single split on every column of the matrix, 0 when no split separates the classes.
+        """
+
+        parent_counts = np.bincount(labels, minlength=len(self.classes))
+        orders = np.argsort(matrix, axis=0, kind='stable')
+
+        gains = np.zeros(matrix.shape[1])
+        for feature in range(matrix.shape[1]):
+            order = orders[:, feature]
+            gain, _ = self.best_threshold(matrix[order, feature], labels[order], parent_counts)
+            gains[feature] = max(gain, 0.0)
+
+        return gains
+
+    def quantize(self, matrix):
+        """
+        Returns the bin codes of the matrix, and the upper threshold of every bin of each feature.
+        Each column is cut into at most max_bins bins holding about the same number of rows.
+        """
+
+        codes = np.zeros(matrix.shape, dtype=np.intp)
+        bin_thresholds = []
+
+        for feature in range(matrix.shape[1]):
+            column = matrix[:, feature]
+            values = np.unique(column)
+            edges = (values[:-1] + values[1:]) / 2
+            if len(values) > self.max_bins:
+                ranks = np.searchsorted(values, np.sort(column))
+                cuts = ranks[np.arange(1, self.max_bins) * len(column) // self.max_bins]
+                edges = edges[np.unique(np.minimum(cuts, len(edges) - 1))]
+
+            codes[:, feature] = np.searchsorted(edges, column, side='left')
+            bin_thresholds.append(np.append(edges, values[-1:]))
+
+        return codes, bin_thresholds
+
+    def histogram(self, indices):
+        """
+        Returns the class counts of the rows in every bin of every feature.
+        """
+
+        shape = (len(self.features), self.max_bins, len(self.classes))
+        keys = (np.arange(shape[0]) * shape[1] + self.codes[indices]) * shape[2] + self.labels[indices][:, None]
+
+        return np.bincount(keys.ravel(), minlength=np.prod(shape)).reshape(shape)
+
+    def split_histogram(self, indices, features: list[int], histogram):
+        """
+        Splits the rows on the best attribute and bin, from the class histogram of the rows.
+        The smaller child's histogram is counted and the larger one is the parent's minus the sibling's.
+        Returns the best feature, threshold and gain, and the children as (indices, histogram) pairs.
+        """
+
+        parent_counts = self.class_counts(indices)
+        best_feature: int
+        best_bin: int
+        max_gain = -1
+
+        for feature in features:
+            bins = np.flatnonzero(histogram[feature].sum(axis=1))
+            if len(bins) == 1:
+                gain, cut = 0.0, 0
+            else:
+                gain, cut = self.best_cut(histogram[feature][bins], parent_counts)
+            if gain > max_gain:
+                max_gain = gain
+                best_feature = feature
+                best_bin = bins[cut]
+
+        mask = self.codes[indices, best_feature] <= best_bin
+        left, right = indices[mask], indices[~mask]
+        if len(left) <= len(right):
+            left_histogram = self.histogram(left)
+            right_histogram = histogram - left_histogram
+        else:
+            right_histogram = self.histogram(right)
+            left_histogram = histogram - right_histogram
+
+        splitted_data = [(left, left_histogram), (right, right_histogram)]
+
+        return best_feature, float(self.bin_thresholds[best_feature][best_bin]), max_gain, [subset for subset in splitted_data if len(subset[0])]
     
-    def gain(self, parent, left, right):
+    def gain(self, parent_counts, left_counts, right_counts):
         """
-        Returns the information gain of the split.
+        Returns the information gain of the splits, from the class counts of the parent and both sides.
         """
 
-        return self.entropy(parent) - self.entropy(left) * len(left) / len(parent) - self.entropy(right) * len(right) / len(parent)
+        parent_size = parent_counts.sum()
+        left_size = left_counts.sum(axis=-1)
+        right_size = right_counts.sum(axis=-1)
+
+        return self.entropy(parent_counts) - self.entropy(left_counts) * left_size / parent_size - self.entropy(right_counts) * right_size / parent_size
     
-    def entropy(self, data):
+    def entropy(self, counts):
         """
-        Returns the entropy of the data.
+        Returns the entropy of the class counts, along the last axis.
         """
 
-        if len(data) == 0:
-            return 0
-        classes = [e["class"] for e in data]
-        return -1 * sum([classes.count(c) / len(data) * math.log(classes.count(c) / len(data), 2) for c in set(classes)])
+        sizes = counts.sum(axis=-1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            probabilities = counts / sizes
+            terms = np.where(counts > 0, probabilities * (np.log(probabilities) / np.log(2)), 0.0)
+
+        return -1 * terms.sum(axis=-1)
+
+    def parameters(self):
+        """
+        Returns the parameters of the tree, to build another tree the same way.
+        """
+
+        return {'splitter': self.splitter, 'max_bins': self.max_bins, 'max_depth': self.max_depth, 'min_samples_split': self.min_samples_split,
+                'min_gain': self.min_gain, 'pruning_confidence': self.pruning_confidence}
 
     def generate_tree(self):
         """
         Generates the decision tree.
         """
 
-        self.tree = self.__generate_tree_rec(self.data, self.features)
+        self.generate_tree_from_matrix(*self.to_columns(self.data))
 
-    def __generate_tree_rec(self, data, features):
+    def generate_tree_from_matrix(self, matrix, labels):
+        """
+        Generates the decision tree from a feature matrix and a class vector.
+        """
+
+        self.matrix, self.labels = matrix, labels
+        indices = np.arange(len(self.labels))
+
+        context = None
+        if self.splitter == 'presorted':
+            context = np.argsort(self.matrix, axis=0, kind='stable')
+        elif self.splitter == 'histogram':
+            self.codes, self.bin_thresholds = self.quantize(self.matrix)
+            context = self.histogram(indices)
+
+        self.tree = self.__generate_tree_rec(indices, list(range(len(self.features))), context)
+
+        if self.pruning_confidence is not None:
+            self.prune(self.pruning_confidence)
+        else:
+            self.compile()
+
+    def __generate_tree_rec(self, indices, features, context=None, depth=0):
         """
         Recursively generates the decision tree.
+        The context is the presorted orders in 'presorted' mode, the class histogram in 'histogram' mode and None otherwise.
         """
+
+        counts = self.class_counts(indices)
         
         # If all data is of the same class, return a leaf node with that class
-        if len(set([e["class"] for e in data])) == 1:
-            return Node(True, data[0]["class"], None)
+        if np.count_nonzero(counts) == 1:
+            return Node(True, self.classes[self.labels[indices[0]]], None, counts)
         
-        # If there are no more features to split on, return a leaf node with the majority class
-        if len(features) == 0:
-            return Node(True, self.get_majority_class(data), None)
+        # If there are no more features to split on, or the tree is deep enough, return a leaf node with the majority class
+        if len(features) == 0 or len(indices) < self.min_samples_split or (self.max_depth is not None and depth >= self.max_depth):
+            return Node(True, self.classes[np.argmax(counts)], None, counts)
         
-        best_feature, best_threshold, splitted_data = self.split_attribute(data, features)
+        if self.splitter == 'histogram':
+            best_feature, best_threshold, gain, splitted_data = self.split_histogram(indices, features, context)
+        else:
+            best_feature, best_threshold, gain, splitted_data = self.split_attribute(indices, features, context)
+
+        if self.min_gain is not None and gain < self.min_gain:
+            return Node(True, self.classes[np.argmax(counts)], None, counts)
+
         remaining_features = features.copy()
         remaining_features.remove(best_feature)
 
-        node = Node(False, best_feature, best_threshold)
-        node.children = [self.__generate_tree_rec(subset, remaining_features) for subset in splitted_data]
+        node = Node(False, self.features[best_feature], best_threshold, counts)
+        node.children = [self.__generate_tree_rec(subset, remaining_features, subset_context, depth + 1) for subset, subset_context in splitted_data]
 
         return node
+
+    def prune(self, confidence=0.25):
+        """
+        Prunes the tree bottom-up, replacing a subtree by a leaf when the leaf's pessimistic error estimate
+        is not higher than the subtree's, as C4.5 does. A lower confidence prunes more.
+        """
+
+        z = NormalDist().inv_cdf(1 - confidence)
+        self.tree, _ = self.__prune_rec(self.tree, z)
+        self.compile()
+
+    def __prune_rec(self, node, z):
+        """
+        Recursively prunes the decision tree, and returns the pruned node with its estimated errors.
+        """
+
+        leaf_errors = self.estimated_errors(node.counts, z)
+        if node.is_leaf:
+            return node, leaf_errors
+
+        subtree_errors = 0
+        for i, child in enumerate(node.children):
+            node.children[i], child_errors = self.__prune_rec(child, z)
+            subtree_errors += child_errors
+
+        if leaf_errors <= subtree_errors:
+            return Node(True, self.classes[np.argmax(node.counts)], None, node.counts), leaf_errors
+
+        return node, subtree_errors
+
+    def estimated_errors(self, counts, z):
+        """
+        Returns the pessimistic number of errors of a leaf with the class counts,
+        from the upper bound of the confidence interval of its error rate.
+        """
+
+        size = counts.sum()
+        rate = (size - counts.max()) / size
+        upper = (rate + z**2 / (2 * size) + z * np.sqrt(rate / size - rate**2 / size + z**2 / (4 * size**2))) / (1 + z**2 / size)
+
+        return size * upper
     
     def print_node(self, node, depth=0):
         """
@@ -132,75 +422,211 @@ class C45:
 
         self.print_node(self.tree)
 
+    def compile(self):
+        """
+        Compiles the tree into parallel arrays of feature index, threshold, left child, right child,
+        parent and leaf class, indexed by node in depth-first order.
+        The last node is a void leaf predicting no class (-1), where a node without right child sends its rows.
+        """
+
+        self.nodes = []
+        feature, threshold, left, right, parent, leaf_class = [], [], [], [], [], []
+
+        stack = [(self.tree, -1, None)]
+        while stack:
+            node, parent_index, side = stack.pop()
+            index = len(self.nodes)
+            self.nodes.append(node)
+            parent.append(parent_index)
+            if side is not None:
+                side[parent_index] = index
+
+            if node.is_leaf:
+                feature.append(-1)
+                threshold.append(np.nan)
+                leaf_class.append(self.classes.index(node.label))
+            else:
+                feature.append(self.features.index(node.label))
+                threshold.append(node.threshold)
+                leaf_class.append(-1)
+            left.append(-1)
+            right.append(-1)
+
+            if len(node.children) == 2:
+                stack.append((node.children[1], index, right))
+            if node.children:
+                stack.append((node.children[0], index, left))
+
+        void = len(self.nodes)
+        self.node_feature = np.array(feature + [-1], dtype=np.intp)
+        self.node_threshold = np.array(threshold + [np.nan], dtype=float)
+        self.node_left = np.array(left + [-1], dtype=np.intp)
+        self.node_right = np.array([void if r == -1 and f != -1 else r for r, f in zip(right, feature)] + [-1], dtype=np.intp)
+        self.node_parent = np.array(parent + [-1], dtype=np.intp)
+        self.node_class = np.array(leaf_class + [-1], dtype=np.intp)
+
+    def apply(self, matrix):
+        """
+        Returns the index of the leaf reached by every row of the matrix.
+        All rows are routed together, one tree level at a time.
+        """
+
+        positions = np.zeros(len(matrix), dtype=np.intp)
+        active = np.flatnonzero(self.node_feature[positions] >= 0)
+
+        while len(active):
+            nodes = positions[active]
+            go_left = matrix[active, self.node_feature[nodes]] <= self.node_threshold[nodes]
+            positions[active] = np.where(go_left, self.node_left[nodes], self.node_right[nodes])
+            active = active[self.node_feature[positions[active]] >= 0]
+
+        return positions
+
+    def predict_batch(self, matrix):
+        """
+        Predicts the class index of every row of the matrix, -1 when a row falls out of the tree.
+        """
+
+        return self.node_class[self.apply(matrix)]
+
+    def get_path(self, index):
+        """
+        Returns the path from the root to a compiled node, as (node, '<=' | '>' | 'leaf') pairs.
+        """
+
+        path = [(self.nodes[index], 'leaf')]
+        while self.node_parent[index] != -1:
+            parent = self.node_parent[index]
+            path.append((self.nodes[parent], '<=' if self.node_left[parent] == index else '>'))
+            index = parent
+
+        return path[::-1]
+
     def get_accuracy(self, split=None):
         """
         Returns the accuracy of the decision tree.
         """
         
-        data = self.data.copy()
+        matrix, labels = self.columns()
         if split:
-            random.shuffle(data)
-            data = data[:len(data) // split]
+            rows = list(range(len(labels)))
+            random.shuffle(rows)
+            rows = rows[:len(rows) // split]
+            matrix, labels = matrix[rows], labels[rows]
 
-        return self.__get_accuracy_rec(self.tree, data) / len(data)
-    
-    def __get_accuracy_rec(self, node, data):
+        return self.get_accuracy_from_matrix(matrix, labels)
+
+    def get_accuracy_from_matrix(self, matrix, labels):
         """
-        Recursively calculates the accuracy of the decision tree.
+        Returns the accuracy of the decision tree on a feature matrix and a class vector.
         """
 
-        if node.is_leaf:
-            return sum([1 for e in data if e["class"] == node.label])
-        else:
-            left_data = [e for e in data if e[node.label] <= node.threshold]
-            if len (node.children) == 2:
-                right_data = [e for e in data if e[node.label] > node.threshold]
-                return self.__get_accuracy_rec(node.children[0], left_data) + self.__get_accuracy_rec(node.children[1], right_data)
-            else:
-                return self.__get_accuracy_rec(node.children[0], left_data)
+        return int(np.count_nonzero(self.predict_batch(matrix) == labels)) / len(labels)
         
     def predict(self, data):
         """
         Predicts the class of a data point.
         """
 
-        return self.__predict_rec(self.tree, data)
-    
-    def __predict_rec(self, node, data):
+        prediction = self.predict_batch(np.array([[data[feature] for feature in self.features]], dtype=float))[0]
+
+        return self.classes[prediction] if prediction != -1 else None
+            
+    def save(self, path):
         """
-        Recursively predicts the class of a data point.
+        Saves the compiled tree, its parameters and its training columns to a compressed .npz file.
         """
 
-        if node.is_leaf:
-            return node.label
+        counts = np.array([node.counts for node in self.nodes] + [np.zeros(len(self.classes), dtype=int)])
+        np.savez_compressed(path, classes=np.array(self.classes), features=np.array(self.features), parameters=np.array(json.dumps(self.parameters())),
+                            node_feature=self.node_feature, node_threshold=self.node_threshold, node_left=self.node_left, node_right=self.node_right,
+                            node_class=self.node_class, node_counts=counts, matrix=self.matrix, labels=self.labels)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a tree saved with save, rebuilding its nodes from the compiled arrays.
+        """
+
+        with np.load(path) as file:
+            tree = cls(None, file['classes'].tolist(), file['features'].tolist(), **json.loads(file['parameters'].item()))
+            tree.matrix, tree.labels = file['matrix'], file['labels']
+
+            void = len(file['node_feature']) - 1
+            nodes = []
+            for feature, threshold, label, counts in zip(file['node_feature'][:-1], file['node_threshold'][:-1], file['node_class'][:-1], file['node_counts'][:-1]):
+                if feature == -1:
+                    nodes.append(Node(True, tree.classes[label], None, counts))
+                else:
+                    nodes.append(Node(False, tree.features[feature], float(threshold), counts))
+
+            for node, left, right in zip(nodes, file['node_left'][:-1], file['node_right'][:-1]):
+                node.children = [nodes[child] for child in [left, right] if child not in [-1, void]]
+
+        tree.tree = nodes[0]
+        tree.compile()
+
+        return tree
+
+    def cross_validation(self, k, processes=None):
+        """
+        Performs k-fold cross validation, without changing the tree.
+        The folds are built in a pool of processes sharing the feature matrix.
+        Returns the accuracy and the training time of every fold.
+        """
+
+        matrix, labels = self.columns()
+        args = (matrix, labels, self.classes, self.features, self.parameters())
+        folds = [(i, k) for i in range(k)]
+
+        if processes is None:
+            processes = k
+
+        if processes == 1:
+            _init_cross_validation(*args)
+            results = [_cross_validation_fold(fold) for fold in folds]
         else:
-            if data[node.label] <= node.threshold:
-                return self.__predict_rec(node.children[0], data)
-            else:
-                return self.__predict_rec(node.children[1], data)
-            
+            with Pool(processes=processes, initializer=_init_cross_validation, initargs=args) as pool:
+                results = pool.map(_cross_validation_fold, folds, chunksize=1)
+                pool.close()
+
+        accuracies = [accuracy for accuracy, _ in results]
+        times = [duration for _, duration in results]
+
+        return accuracies, times
+
     def k_fold_cross_validation(self, k):
         """
-        Performs k-fold cross validation.
+        Performs k-fold cross validation, and returns the mean accuracy.
         """
         
-        save = self.data.copy()
-        data = self.data.copy()
-        data = [data[i::k] for i in range(k)]
-        accuracies = []
-        
-        for i in range(k):
-            test_data = data[i]
-            train_data = []
-            for j in range(k):
-                if j != i:
-                    train_data += data[j]
-            
-            self.data = train_data
-            self.generate_tree()
-            self.data = test_data
-            accuracies.append(self.get_accuracy())
-            
-        self.data = save
-        self.generate_tree()
-        return sum(accuracies) / len(accuracies)
\ No newline at end of file
+        accuracies, _ = self.cross_validation(k)
+
+        return sum(accuracies) / len(accuracies)
+
+
+def _init_cross_validation(matrix, labels, classes, features, parameters):
+    """
+    Shares the columns of the data with a cross validation worker.
+    """
+
+    global _cross_validation_columns
+    _cross_validation_columns = (matrix, labels, classes, features, parameters)
+
+def _cross_validation_fold(args):
+    """
+    Trains the tree of a fold on the other folds, and returns its accuracy on the fold and its training time.
+    """
+
+    fold, k = args
+    matrix, labels, classes, features, parameters = _cross_validation_columns
+
+    test = np.zeros(len(labels), dtype=bool)
+    test[fold::k] = True
+
+    t0 = time.perf_counter()
+    tree = C45(None, classes, features, **parameters)
+    tree.generate_tree_from_matrix(matrix[~test], labels[~test])
+    duration = time.perf_counter() - t0
+
+    return tree.get_accuracy_from_matrix(matrix[test], labels[test]), duration
\ No newline at end of file
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class Dataset:
+    """
+    A class to represent the data of a decision tree, kept in memory: the names of the classes
+    and features, a feature matrix with one row per game, and the class index of every game.
+    """
+
+    def __init__(self, classes: list[str], features: list[str], matrix, labels) -> None:
+        self.classes = classes
+        self.features = features
+        self.matrix = matrix
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return f'Dataset(games={len(self)}, features={len(self.features)}, classes={self.classes})'
+
+    def save(self, path):
+        """
+        Exports the dataset to a binary .npz file.
+        """
+
+        np.savez(path, classes=np.array(self.classes), features=np.array(self.features), matrix=self.matrix, labels=self.labels)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a dataset exported with save.
+        """
+
+        with np.load(path) as file:
+            return cls(file['classes'].tolist(), file['features'].tolist(), file['matrix'], file['labels'])
@@ -0,0 +1,120 @@
+import numpy as np
+from multiprocessing import Pool
+
+from classes.c45 import C45
+
+# Read-only columns shared with the forest workers
+_forest_columns = None
+
+
+class RandomForest:
+    """
+    A class to represent a bagged ensemble of C4.5 decision trees.
+    Every tree is trained on a bootstrap sample of the rows and a random subset of max_features features,
+    in a pool of processes sharing the feature matrix. The forest predicts the majority vote of its trees,
+    with an odd default number of trees so that two classes cannot tie when every tree votes. The remaining ties, and the rows
+    on which no tree reaches a real leaf, go to the class most frequent in the training labels.
+    The data is a list of dicts, or None for a forest trained directly on a feature matrix with generate_forest_from_matrix.
+    The other parameters are passed to every C45 tree.
+    """
+    def __init__(self, data, classes: list[str], features: list[str], n_trees: int = 101, max_features: int = None,
+                 processes: int = 12, seed: int = None, **parameters) -> None:
+        self.data = data
+        self.classes = classes
+        self.features = features
+        self.n_trees = n_trees
+        self.max_features = max_features or max(1, round(np.sqrt(len(features))))
+        self.processes = processes
+        self.seed = seed
+        self.parameters = parameters
+
+        self.columns = C45(data, classes, features)
+        self.matrix = None
+        self.labels = None
+        self.prior = None
+        self.trees = []
+
+    def generate_forest(self):
+        """
+        Generates the trees of the forest.
+        """
+
+        self.generate_forest_from_matrix(*self.columns.to_columns(self.data))
+
+    def generate_forest_from_matrix(self, matrix, labels):
+        """
+        Generates the trees of the forest from a feature matrix and a class vector.
+        """
+
+        self.matrix, self.labels = matrix, labels
+        self.prior = np.bincount(labels, minlength=len(self.classes))
+        args = (matrix, labels, self.classes, self.features, self.max_features, self.parameters)
+        seeds = np.random.default_rng(self.seed).integers(2**32, size=self.n_trees).tolist()
+
+        if self.processes == 1:
+            _init_forest(*args)
+            self.trees = [_train_forest_tree(seed) for seed in seeds]
+        else:
+            with Pool(processes=self.processes, initializer=_init_forest, initargs=args) as pool:
+                self.trees = pool.map(_train_forest_tree, seeds)
+                pool.close()
+
+    def predict_batch(self, matrix):
+        """
+        Predicts the class index of every row of the matrix, by majority vote of the trees.
+        Ties between the most voted classes are broken by the number of training rows of each class.
+        """
+
+        votes = np.zeros((len(matrix), len(self.classes)), dtype=int)
+        rows = np.arange(len(matrix))
+
+        for subset, tree in self.trees:
+            predictions = tree.predict_batch(matrix[:, subset])
+            voted = predictions != -1
+            np.add.at(votes, (rows[voted], predictions[voted]), 1)
+
+        # The prior counts are below len(labels) + 1, so they only order the classes with the same number of votes
+        return np.argmax(votes * (len(self.labels) + 1) + self.prior, axis=1)
+
+    def predict(self, data):
+        """
+        Predicts the class of a data point.
+        """
+
+        return self.classes[self.predict_batch(np.array([[data[feature] for feature in self.features]], dtype=float))[0]]
+
+    def get_accuracy(self):
+        """
+        Returns the accuracy of the forest on its data.
+        """
+
+        matrix, labels = (self.matrix, self.labels) if self.data is None else self.columns.to_columns(self.data)
+
+        return int(np.count_nonzero(self.predict_batch(matrix) == labels)) / len(labels)
+
+
+def _init_forest(matrix, labels, classes, features, max_features, parameters):
+    """
+    Shares the columns of the data with a forest worker.
+    """
+
+    global _forest_columns
+    _forest_columns = (matrix, labels, classes, features, max_features, parameters)
+
+def _train_forest_tree(seed):
+    """
+    Trains a tree on a bootstrap sample of the rows and a random subset of the features.
+    Returns the indices of the features and the tree, without its training columns.
+    """
+
+    matrix, labels, classes, features, max_features, parameters = _forest_columns
+    rng = np.random.default_rng(seed)
+
+    rows = rng.integers(len(labels), size=len(labels))
+    subset = np.sort(rng.choice(len(features), size=min(max_features, len(features)), replace=False))
+
+    tree = C45(None, classes, [features[feature] for feature in subset], **parameters)
+    tree.generate_tree_from_matrix(matrix[np.ix_(rows, subset)], labels[rows])
+    tree.matrix, tree.labels, tree.codes = None, None, None
+
+    return subset, tree
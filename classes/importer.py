@@ -1,18 +1,32 @@
+import os
 import json
 import pickle
+import hashlib
 import pathlib
+import numpy as np
 
 from classes.game import Game
 from classes.player import Player
 from classes.utils import duration_to_int
+from classes.dataset import Dataset
+from classes.metric_tensor import METRICS, NODES, MetricTensor, metrics_to_array
+from classes.metrics_memo import MetricsMemo
 
 BATCH_DATA_PATH = pathlib.Path('get_data/games/batch_data.json')
 SAVED_GAMES_PATH = pathlib.Path('get_data/saved_games.json')
 DONE_OBJECTS_PATH = pathlib.Path('game_objects/done.json')
 DONE_GAMES_FOLDER = pathlib.Path('get_data/data')
 GRAPHS_PATH = pathlib.Path('graph_data/graphs.json')
-GRAPHS_NAMES_PATH = pathlib.Path('graph_data/names.json')
-GRAPHS_DATA_PATH = pathlib.Path('graph_data/data.json')
+METRICS_PATH = pathlib.Path('graph_data/metrics.bin')
+METRICS_INDEX_PATH = pathlib.Path('graph_data/metrics_index.json')
+DATASET_PATH = pathlib.Path('graph_data/dataset.npz')
+MODELS_PATH = pathlib.Path('graph_data/models')
+CHECKPOINT_PATH = pathlib.Path('graph_data/train_features.ckpt')
+GAINS_PATH = pathlib.Path('graph_data/gains.npz')
+METRICS_MEMO_PATH = pathlib.Path('graph_data/metrics_memo.npz')
+
+# Metric tensor of the metrics store with the fingerprint of the store it was mapped from
+_metric_tensor = None
 
 
 def write_batch_data(file):
@@ -129,42 +143,146 @@ def get_done_game(game_id):
     with open(DONE_GAMES_FOLDER / f'{game_id[5:]}.json', 'r') as file:
         return json.load(file)
     
-def write_graphs(graphs):
+def get_graphs():
     """
-    Write the graphs to the graphs.json file.
+    Get the graphs from the graphs.json file written by older versions.
     """
-    
-    with open(GRAPHS_PATH, 'w') as file:
-        json.dump(graphs, file, indent=4)
 
-def get_graphs():
+    with open(GRAPHS_PATH, 'r') as file:
+        return json.load(file)
+
+def convert_graphs():
     """
-    Get the graphs from the graphs.json file.
+    Convert the graphs.json file written by older versions to the metrics store.
     """
 
-    with open(GRAPHS_PATH, 'r') as file:
+    write_metrics([(graph['game_id'], graph['winner'], np.array([metrics_to_array(frame['metrics']) for frame in graph['time_frames']]).reshape(-1, len(METRICS), len(NODES)))
+                   for graph in get_graphs()])
+
+def get_metrics_index():
+    """
+    Get the index of the metrics store, with the id, winner, offset and number of time frames of every game.
+    """
+
+    if not METRICS_INDEX_PATH.exists():
+        return []
+
+    with open(METRICS_INDEX_PATH, 'r') as file:
         return json.load(file)
 
-def get_graphs_files():
+def write_metrics(graphs, append=False):
+    """
+    Write the metrics of the games to the metrics store: the metrics.bin file holds the metrics of every time frame as raw floats, game after game,
+    and its index the id, winner, offset and number of time frames of every game. The graphs are (game id, winner, metrics) tuples,
+    with the metrics indexed by time frame, metric and node. In append mode, the games are written after the stored ones without rewriting them.
+    """
+
+    append = append and METRICS_PATH.exists()
+    index = get_metrics_index() if append else []
+    offset = sum([entry['frames'] for entry in index])
+
+    # A full rewrite goes to a temporary file, so that the stored metrics stay whole until the new ones are complete
+    path = METRICS_PATH if append else METRICS_PATH.with_name(METRICS_PATH.name + '.tmp')
+    with open(path, 'r+b' if append else 'wb') as file:
+        # Anything written after the last indexed game, by an interrupted append, is dropped
+        file.truncate(offset * len(METRICS) * len(NODES) * np.dtype(np.float64).itemsize)
+        file.seek(0, 2)
+        for game_id, winner, metrics in graphs:
+            file.write(np.ascontiguousarray(metrics, dtype=np.float64).tobytes())
+            index.append({'game_id': game_id, 'winner': winner, 'offset': offset, 'frames': len(metrics)})
+            offset += len(metrics)
+
+    temporary_path = METRICS_INDEX_PATH.with_name(METRICS_INDEX_PATH.name + '.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump(index, file, indent=4)
+
+    # The index is replaced last, so that it never refers to metrics that are not written
+    if not append:
+        os.replace(path, METRICS_PATH)
+    os.replace(temporary_path, METRICS_INDEX_PATH)
+
+def get_metrics_fingerprint():
+    """
+    Get a fingerprint of the metrics store, which changes when metrics are written to it.
+    """
+
+    stat = METRICS_INDEX_PATH.stat()
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+def get_games_key(games, features, **fields):
+    """
+    Get a hash of the features, the games and the metrics store, with the other fields a result computed from them depends on.
+    """
+
+    key = {
+        'features': features,
+        'games': [[game.game_id, game.winner] for game in games],
+        'metrics': get_metrics_fingerprint(),
+        **fields
+    }
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def get_metric_tensor():
     """
-    Get the graphs files from the graph_data folder.
+    Get the metric tensor of the metrics store, mapped once per process and again when the store changes.
     """
 
-    with open(GRAPHS_NAMES_PATH, "r") as file:
-        names = json.load(file)
+    global _metric_tensor
 
-    with open(GRAPHS_DATA_PATH, "r") as file:
-        data = json.load(file)
+    fingerprint = get_metrics_fingerprint()
+    if _metric_tensor is None or _metric_tensor[0] != fingerprint:
+        _metric_tensor = (fingerprint, MetricTensor.load(METRICS_PATH, get_metrics_index()))
 
-    return names, data
+    return _metric_tensor[1]
 
-def write_graphs_files(names, data):
+def get_dataset():
     """
-    Write the graphs files to the graph_data folder.
+    Get the dataset exported to the graph_data folder.
+    """
+
+    return Dataset.load(DATASET_PATH)
+
+def write_dataset(dataset):
     """
+    Export the dataset to the graph_data folder.
+    """
+
+    dataset.save(DATASET_PATH)
+
+def get_gains(key):
+    """
+    Get the information gain table exported to the graph_data folder, or None if it was computed under another key.
+    """
+
+    if not GAINS_PATH.exists():
+        return None
 
-    with open(GRAPHS_NAMES_PATH, "w") as file:
-        json.dump(names, file, indent=4)
+    with np.load(GAINS_PATH) as data:
+        if str(data['key']) != key:
+            return None
+        return data['gains']
+
+def write_gains(key, gains):
+    """
+    Export the information gain table to the graph_data folder, with the key of the games and features it was computed for.
+    """
+
+    np.savez(GAINS_PATH, key=key, gains=gains)
+
+def get_metrics_memo():
+    """
+    Get the memo table of the graph metrics exported to the graph_data folder, or a new one.
+    """
+
+    if not METRICS_MEMO_PATH.exists():
+        return MetricsMemo()
+
+    return MetricsMemo.load(METRICS_MEMO_PATH)
+
+def write_metrics_memo(memo):
+    """
+    Export the memo table of the graph metrics to the graph_data folder.
+    """
 
-    with open(GRAPHS_DATA_PATH, "w") as file:
-        json.dump(data, file, indent=4)
\ No newline at end of file
+    memo.save(METRICS_MEMO_PATH)
\ No newline at end of file
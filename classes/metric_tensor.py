@@ -0,0 +1,101 @@
+import numpy as np
+
+METRICS = ['indeg', 'outdeg', 'cls', 'btw', 'eige']
+NODES = ['T1-R1', 'T1-R2', 'T1-R3', 'T1-R4', 'T1-R5', 'T2-R1', 'T2-R2', 'T2-R3', 'T2-R4', 'T2-R5', 'DEATH']
+
+VOID_METRICS = {
+    'indeg': {'T1-R1': 0, 'T1-R2': 0, 'T1-R3': 0, 'T1-R4': 0, 'T1-R5': 0, 'T2-R1': 0, 'T2-R2': 0, 'T2-R3': 0, 'T2-R4': 0, 'T2-R5': 0, 'DEATH': 0},
+    'outdeg': {'T1-R1': 0, 'T1-R2': 0, 'T1-R3': 0, 'T1-R4': 0, 'T1-R5': 0, 'T2-R1': 0, 'T2-R2': 0, 'T2-R3': 0, 'T2-R4': 0, 'T2-R5': 0, 'DEATH': 0},
+    'cls': {'T1-R1': 0.0, 'T1-R2': 0.0, 'T1-R3': 0.0, 'T1-R4': 0.0, 'T1-R5': 0.0, 'T2-R1': 0.0, 'T2-R2': 0.0, 'T2-R3': 0.0, 'T2-R4': 0.0, 'T2-R5': 0.0, 'DEATH': 0.0},
+    'btw': {'T1-R1': 0.0, 'T1-R2': 0.0, 'T1-R3': 0.0, 'T1-R4': 0.0, 'T1-R5': 0.0, 'T2-R1': 0.0, 'T2-R2': 0.0, 'T2-R3': 0.0, 'T2-R4': 0.0, 'T2-R5': 0.0, 'DEATH': 0.0},
+    'eige': {'T1-R1': 0.30151134457776363, 'T1-R2': 0.30151134457776363, 'T1-R3': 0.30151134457776363, 'T1-R4': 0.30151134457776363, 'T1-R5': 0.30151134457776363, 'T2-R1': 0.30151134457776363, 'T2-R2': 0.30151134457776363, 'T2-R3': 0.30151134457776363, 'T2-R4': 0.30151134457776363, 'T2-R5': 0.30151134457776363, 'DEATH': 0.30151134457776363}
+}
+
+
+def metrics_to_array(metrics):
+    """
+    Convert the metrics dict of a time frame to an array indexed by metric and node.
+    """
+
+    return np.array([[metrics[metric][node] for node in NODES] for metric in METRICS], dtype=float)
+
+def array_to_metrics(array):
+    """
+    Convert an array indexed by metric and node to the metrics dict of a time frame, with integer degrees.
+    """
+
+    return {metric: {node: int(value) if metric in ['indeg', 'outdeg'] else float(value) for node, value in zip(NODES, row)}
+            for metric, row in zip(METRICS, array)}
+
+def games_labels(games):
+    """
+    Returns the class index of every game: 0 when the blue team won, 1 otherwise.
+    """
+
+    return np.array([0 if game.winner == 'blue' else 1 for game in games], dtype=int)
+
+
+class MetricTensor:
+    """
+    The metrics of the games, indexed by game, time frame, metric and node, over the metrics store:
+    a flat array of the metrics of every time frame, game after game, and an index of the offset and number of time frames of every game.
+    The time frames after the end of a game hold the void metrics.
+    """
+
+    def __init__(self, frames, index) -> None:
+        self.frames = frames
+        self.game_ids = [entry['game_id'] for entry in index]
+        self.winners = [entry['winner'] for entry in index]
+        self.rows = {game_id: row for row, game_id in enumerate(self.game_ids)}
+        self.offsets = np.array([entry['offset'] for entry in index], dtype=np.intp)
+        self.lengths = np.array([entry['frames'] for entry in index], dtype=np.intp)
+
+    @classmethod
+    def load(cls, path, index):
+        """
+        Maps the raw metrics file of the store, without reading it, with the index of its games.
+        """
+
+        nb_frames = sum([entry['frames'] for entry in index])
+        if nb_frames == 0:
+            return cls(np.empty((0, len(METRICS), len(NODES))), index)
+
+        return cls(np.memmap(path, dtype=np.float64, mode='r', shape=(nb_frames, len(METRICS), len(NODES))), index)
+
+    def dense(self, game_ids):
+        """
+        Returns the dense array of the metrics of the games, indexed by game, time frame, metric and node,
+        with the void metrics after the end of every game and in one last time frame after the longest game.
+        """
+
+        rows = np.array([self.rows[game_id] for game_id in game_ids], dtype=np.intp)
+        lengths = self.lengths[rows]
+
+        tensor = np.empty((len(rows), lengths.max(initial=0) + 1, len(METRICS), len(NODES)))
+        tensor[:] = metrics_to_array(VOID_METRICS)
+
+        games = np.repeat(np.arange(len(rows)), lengths)
+        time_frames = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        tensor[games, time_frames] = self.frames[self.offsets[rows][games] + time_frames]
+
+        return tensor
+
+    def gather(self, game_ids, features):
+        """
+        Returns the matrix of the features of the games, with one row per game and one column per feature.
+        A feature is a (metric, node, time frame) tuple.
+        """
+
+        rows = np.array([self.rows[game_id] for game_id in game_ids], dtype=np.intp)
+        metrics = np.array([METRICS.index(feature[0]) for feature in features], dtype=np.intp)
+        nodes = np.array([NODES.index(feature[1]) for feature in features], dtype=np.intp)
+        time_frames = np.array([feature[2] for feature in features], dtype=np.intp)
+
+        # Only the time frames inside the games are read from the store
+        inside = time_frames[None, :] < self.lengths[rows][:, None]
+        matrix = np.empty(inside.shape)
+        matrix[:] = metrics_to_array(VOID_METRICS)[metrics, nodes]
+        games, columns = np.nonzero(inside)
+        matrix[games, columns] = self.frames[self.offsets[rows][games] + time_frames[columns], metrics[columns], nodes[columns]]
+
+        return matrix
@@ -0,0 +1,67 @@
+import numpy as np
+
+from classes.metric_tensor import METRICS, NODES
+from methods.graph_metrics import EDGES, edge_bitmasks, get_metrics_batch
+
+# Number of missing graphs computed per task when the memo table is filled by a pool of processes
+CHUNK_SIZE = 256
+
+
+class MetricsMemo:
+    """
+    A memo table of the metrics of the interaction graphs, keyed by the bitmask of their edges.
+    The empty graph and the graphs of a single edge are always in the table.
+    """
+
+    def __init__(self, masks=None, metrics=None) -> None:
+        self.table = {}
+        self.hits = 0
+        self.misses = 0
+
+        if masks is not None:
+            self.table.update(zip(masks.tolist(), metrics))
+
+        seeds = np.zeros((len(EDGES) + 1, len(NODES) ** 2), dtype=bool)
+        seeds[np.arange(1, len(EDGES) + 1), EDGES] = True
+        self.get_metrics(seeds.reshape(-1, len(NODES), len(NODES)))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def get_metrics(self, adjacency, imap=map):
+        """
+        Returns the metrics of a stack of adjacency matrices like get_metrics_batch, only computing the graphs missing from the table.
+        The missing graphs are computed in chunks with imap, e.g. the imap of a pool of processes.
+        """
+
+        masks, first, inverse = np.unique(edge_bitmasks(adjacency), return_index=True, return_inverse=True)
+        missing = [i for i, mask in enumerate(masks.tolist()) if mask not in self.table]
+
+        if missing:
+            chunks = [adjacency[first[missing[i:i + CHUNK_SIZE]]] for i in range(0, len(missing), CHUNK_SIZE)]
+            self.table.update(zip(masks[missing].tolist(), np.concatenate(list(imap(get_metrics_batch, chunks)))))
+        self.misses += len(missing)
+        self.hits += len(adjacency) - len(missing)
+
+        return np.array([self.table[mask] for mask in masks.tolist()]).reshape(len(masks), len(METRICS), len(NODES))[inverse]
+
+    def hit_rate(self):
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0
+
+    def save(self, path):
+        """
+        Exports the memo table to a binary .npz file.
+        """
+
+        np.savez(path, masks=np.array(list(self.table), dtype=np.uint64), metrics=np.array(list(self.table.values())))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a memo table exported with save.
+        """
+
+        with np.load(path) as file:
+            return cls(file['masks'], file['metrics'])
@@ -0,0 +1,50 @@
+import os
+
+import classes.importer as importer
+from classes.c45 import C45
+
+
+class ModelCache:
+    """
+    A least recently used cache of trained C45 trees, saved on disk.
+    A tree is keyed by a hash of its feature list, its parameters and the fingerprint of the game set.
+    """
+
+    def __init__(self, path=None, max_entries: int = 64) -> None:
+        self.path = path or importer.MODELS_PATH
+        self.max_entries = max_entries
+
+    def key(self, games, features, parameters=None) -> str:
+        """
+        Returns the key of the tree trained on the games with the features and parameters.
+        """
+
+        return importer.get_games_key(games, features, parameters=parameters or {})
+
+    def get(self, key):
+        """
+        Returns the cached tree of the key, or None, and marks it as recently used.
+        """
+
+        path = self.path / f'{key}.npz'
+        if not path.exists():
+            return None
+
+        os.utime(path)
+        return C45.load(path)
+
+    def put(self, key, tree):
+        """
+        Saves the tree under the key, then evicts the least recently used trees above max_entries.
+        """
+
+        if not self.path.exists():
+            self.path.mkdir(parents=True)
+
+        temporary_path = self.path / f'{key}.tmp.npz'
+        tree.save(temporary_path)
+        os.replace(temporary_path, self.path / f'{key}.npz')
+
+        entries = sorted(self.path.glob('*.npz'), key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:max(0, len(entries) - self.max_entries)]:
+            entry.unlink()
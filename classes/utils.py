@@ -5,7 +5,7 @@ import logging
 from math import exp
 from PIL import Image
 
-from methods.get_tree import create_decision_tree_files, create_decision_tree
+from methods.get_tree import create_dataset, create_decision_tree_from_dataset
 
 
 log = logging.getLogger(__name__)
@@ -121,14 +121,15 @@ def show_tree_stats(games, features):
     Show the stats of the decision tree.
     """
     
-    create_decision_tree_files(games, features)
-    tree = create_decision_tree()
+    tree = create_decision_tree_from_dataset(create_dataset(games, features))
     acc = tree.get_accuracy()
     log.info(f'Fixed accuracy: {acc - accuracy_fix(features)}')
     log.info(f'Accuracy: {acc}')
     log.info(f'Features: {features}')
     log.info(f'Number of features: {len(features)}')
-    log.info(f'3-fold cross validation: {tree.k_fold_cross_validation(3)}')
+    accuracies, times = tree.cross_validation(3)
+    log.info(f'3-fold cross validation: {sum(accuracies) / len(accuracies)}')
+    log.info(f'Folds accuracy: {[round(accuracy, 3) for accuracy in accuracies]}, training time: {[round(duration, 3) for duration in times]}s')
     log.info('')
 
 def image_grid(imgs, rows, cols):
@@ -63,19 +63,19 @@ def get_objects():
     log.info('Parsing games...')
     parse_all_games()
 
-def get_graphs():
+def get_graphs(incremental=True):
     log.info('Getting graphs...')
     games = importer.get_done_game_objects()
-    save_graphs(games)
+    save_graphs(games, incremental)
 
-def train():
+def train(resume=False):
     log.info('Training features...')
 
     games = importer.get_done_game_objects()
     features = [['indeg', 'outdeg', 'cls', 'btw', 'eige'], list(range(11)), list(range(30))]
 
     t0 = time.perf_counter()
-    m, a, t = train_features(games, 1000, 2, features, 0.8, 0.8, 0.0005)
+    m, a, t = train_features(games, 1000, 2, features, 0.8, 0.8, 0.0005, checkpoint_path=importer.CHECKPOINT_PATH, resume=resume)
     log.info(f'Training time: {time.perf_counter() - t0:.2f}s')
 
     return m, a, t
@@ -7,7 +7,7 @@ from matplotlib import pyplot as plt
 from classes.utils import image_grid
 from methods.get_rules import get_rules
 from classes.FSM import frequent_subgraph_mining
-from methods.get_tree import create_decision_tree_files, create_decision_tree
+from methods.get_tree import get_decision_tree
 
 IMAGES_PATH = pathlib.Path('graph_images')
 
@@ -62,8 +62,7 @@ def construct_fs_from_corpus(games, trained_features, confidence=0.7, support=20
     for features in trained_features:
         flatten_rule_list = []
 
-        create_decision_tree_files(games, features)
-        tree = create_decision_tree()
+        tree = get_decision_tree(games, features)
         rules = get_rules(tree, confidence, support)
         for rule in rules:
             if rules[rule]['path'][-1][0].label == winner:
@@ -71,7 +70,7 @@ def construct_fs_from_corpus(games, trained_features, confidence=0.7, support=20
         total_rules += len(flatten_rule_list)
 
         for rule in flatten_rule_list:
-            log.info(f'Rule: {rule}')
+            log.info(f"Rule: {rule['path']}, support: {rule['support']}, confidence: {rule['confidence']}")
             frequent_subgraphs = frequent_subgraph_mining(games, rule, min_support)
             for time_frame, frequent_subgraph in enumerate(frequent_subgraphs):
                 if len(graphs) <= time_frame:
@@ -89,15 +88,14 @@ def construct_fs_from_rule(games, features, features_name, confidence=0.7, suppo
 
     flatten_rule_list = []
 
-    create_decision_tree_files(games, features)
-    tree = create_decision_tree()
+    tree = get_decision_tree(games, features)
     rules = get_rules(tree, confidence, support)
     for rule in rules:
         if rules[rule]['path'][-1][0].label == winner:
             flatten_rule_list.append(rules[rule])
 
     for rule in flatten_rule_list:
-        log.info(f'Rule: {rule}')
+        log.info(f"Rule: {rule['path']}, support: {rule['support']}, confidence: {rule['confidence']}")
         frequent_subgraphs = frequent_subgraph_mining(games, rule, min_support)
         frequent_subgraphs = [[i] for i in frequent_subgraphs]
         construct_frequents_subgraphs_image(frequent_subgraphs, IMAGES_PATH / 'single_rule' / features_name, f'fs_{confidence}-{support}-{winner}-{min_support}')
@@ -1,8 +1,17 @@
+import time
 import logging
+import numpy as np
 import networkx as nx
+from functools import partial
+from multiprocessing import Pool
 from matplotlib import pyplot as plt
 
 import classes.importer as importer
+from classes.metric_tensor import NODES, array_to_metrics
+from methods.graph_metrics import game_adjacency, get_metrics_batch
+
+# Number of games sent to a worker at once by save_graphs
+GRAPHS_CHUNKSIZE = 8
 
 
 log = logging.getLogger(__name__)
@@ -50,32 +59,47 @@ def get_metrics(graph):
     Get the metrics of the graph.
     """
     
-    indegrees = {}
-    outdegrees = {}
-    for node in graph.nodes:
-        indegrees[node] = graph.in_degree(node)
-        outdegrees[node] = graph.out_degree(node)
-    
-    return (indegrees,
-            outdegrees,
-            nx.closeness_centrality(graph),
-            nx.betweenness_centrality(graph),
-            nx.eigenvector_centrality(graph, max_iter=100000))
+    adjacency = nx.to_numpy_array(graph, nodelist=NODES, dtype=bool)
+    metrics = array_to_metrics(get_metrics_batch(adjacency[None])[0])
+
+    return (metrics['indeg'],
+            metrics['outdeg'],
+            metrics['cls'],
+            metrics['btw'],
+            metrics['eige'])
 
-def save_graphs(games):
+def save_graphs(games, incremental=False, processes=None):
     """
-    Save the graphs of the games.
+    Save the metrics of the graphs of the games to the metrics store, computing the metrics of all their time frames at once.
+    Only the graphs missing from the memo table of the metrics are computed, and the table is saved for the next runs.
+    In incremental mode, only the games missing from the metrics store are computed, and appended to it.
+    The graphs are built by a pool of processes, all the cores by default, keeping the order of the games. With processes=1, everything runs serially.
     """
 
-    graphs = []
+    if incremental:
+        saved_game_ids = {entry['game_id'] for entry in importer.get_metrics_index()}
+        games = [game for game in games if game.game_id not in saved_game_ids]
+        log.info(f'{len(games)} new games to save')
+        if not games:
+            return
+
+    t0 = time.perf_counter()
+    pool = Pool(processes=processes) if processes != 1 else None
+    try:
+        imap = partial(pool.imap, chunksize=GRAPHS_CHUNKSIZE) if pool is not None else map
+
+        memo = importer.get_metrics_memo()
+        adjacency = list(imap(game_adjacency, games))
+        metrics = memo.get_metrics(np.concatenate(adjacency), imap) if adjacency else []
+        log.info(f'Metrics of {len(metrics)} time frames of {len(games)} games computed in {time.perf_counter() - t0:.2f}s')
+        log.info(f'Metrics memo: {memo.hits}/{memo.hits + memo.misses} hits ({memo.hit_rate():.1%}), {len(memo)} graphs')
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
-    for i, game in enumerate(games):
-        log.info(f'Game {i+1}/{len(games)}')
-        game_metrics = {'game_id': game.game_id, 'winner': game.winner, 'time_frames': []}
-        for time_frame in range(len(game.time_frames)):
-            graph = create_graph_from_game(game, time_frame)
-            metrics = get_metrics(graph)
-            game_metrics['time_frames'].append({'metrics': {'indeg': metrics[0], 'outdeg': metrics[1], 'cls': metrics[2], 'btw': metrics[3], 'eige': metrics[4]}})
-        graphs.append(game_metrics)
+    ends = np.cumsum([len(game_adjacency_matrices) for game_adjacency_matrices in adjacency], dtype=int)
+    graphs = [(game.game_id, game.winner, metrics[end - len(game_adjacency_matrices):end]) for game, game_adjacency_matrices, end in zip(games, adjacency, ends)]
 
-    importer.write_graphs(graphs)
\ No newline at end of file
+    importer.write_metrics_memo(memo)
+    importer.write_metrics(graphs, append=incremental)
@@ -1,6 +1,5 @@
 import logging
-
-import classes.importer as importer
+import numpy as np
 
 
 log = logging.getLogger(__name__)
@@ -26,38 +25,27 @@ def show_rules(rules):
 def get_rules(tree, confidence, support):
     """
     Get the rules from the decision tree, with a minimum confidence and support.
+    The rows of a rule are the indices of the games reaching its leaf with its class.
     """
     
     rules = {}
 
-    data = importer.get_graphs_files()[1]
-
-    def __get_path_rec(data, node, path):
-        if node.is_leaf:
-            path.append((node, 'leaf'))
-            return path
-        else:
-            if data[node.label] <= node.threshold:
-                path.append((node, '<='))
-                return __get_path_rec(data, node.children[0], path)
-            elif len(node.children) == 2:
-                path.append((node, '>'))
-                return __get_path_rec(data, node.children[1], path)
-
-    for game in data:
-        path = __get_path_rec(game, tree.tree, [])
-        
-        if path[-1][0] not in rules:
-            rules[path[-1][0]] = {'support': 1, 'confidence': 0}
-            rules[path[-1][0]]['path'] = path
-        else:
-            rules[path[-1][0]]["support"] += 1
-
-        if path[-1][0].label == game["class"]:
-            rules[path[-1][0]]["confidence"] += 1
-
-    for rule in rules:
-        rules[rule]["confidence"] /= rules[rule]["support"]
+    leaves = tree.apply(tree.matrix)
+    void = len(tree.nodes)
+
+    # Rules are listed in the order the games first reach their leaf
+    _, first_rows = np.unique(leaves, return_index=True)
+    for row in sorted(first_rows):
+        leaf = leaves[row]
+        if leaf == void:
+            continue
+
+        rows = leaves == leaf
+        node = tree.nodes[leaf]
+        rules[node] = {'support': int(np.count_nonzero(rows)), 'confidence': 0}
+        rules[node]['path'] = tree.get_path(leaf)
+        rules[node]['rows'] = np.flatnonzero(rows & (tree.labels == tree.node_class[leaf]))
+        rules[node]['confidence'] = len(rules[node]['rows']) / rules[node]['support']
 
     rules = {rule: rules[rule] for rule in rules if rules[rule]["confidence"] >= confidence and rules[rule]["support"] >= support}
 
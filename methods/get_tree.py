@@ -1,75 +1,70 @@
 from classes.c45 import C45
+from classes.dataset import Dataset
+from classes.forest import RandomForest
 import classes.importer as importer
+from classes.model_cache import ModelCache
+from classes.metric_tensor import games_labels
 
-VOID_METRICS = {
-    'indeg': {'T1-R1': 0, 'T1-R2': 0, 'T1-R3': 0, 'T1-R4': 0, 'T1-R5': 0, 'T2-R1': 0, 'T2-R2': 0, 'T2-R3': 0, 'T2-R4': 0, 'T2-R5': 0, 'DEATH': 0},
-    'outdeg': {'T1-R1': 0, 'T1-R2': 0, 'T1-R3': 0, 'T1-R4': 0, 'T1-R5': 0, 'T2-R1': 0, 'T2-R2': 0, 'T2-R3': 0, 'T2-R4': 0, 'T2-R5': 0, 'DEATH': 0},
-    'cls': {'T1-R1': 0.0, 'T1-R2': 0.0, 'T1-R3': 0.0, 'T1-R4': 0.0, 'T1-R5': 0.0, 'T2-R1': 0.0, 'T2-R2': 0.0, 'T2-R3': 0.0, 'T2-R4': 0.0, 'T2-R5': 0.0, 'DEATH': 0.0},
-    'btw': {'T1-R1': 0.0, 'T1-R2': 0.0, 'T1-R3': 0.0, 'T1-R4': 0.0, 'T1-R5': 0.0, 'T2-R1': 0.0, 'T2-R2': 0.0, 'T2-R3': 0.0, 'T2-R4': 0.0, 'T2-R5': 0.0, 'DEATH': 0.0},
-    'eige': {'T1-R1': 0.30151134457776363, 'T1-R2': 0.30151134457776363, 'T1-R3': 0.30151134457776363, 'T1-R4': 0.30151134457776363, 'T1-R5': 0.30151134457776363, 'T2-R1': 0.30151134457776363, 'T2-R2': 0.30151134457776363, 'T2-R3': 0.30151134457776363, 'T2-R4': 0.30151134457776363, 'T2-R5': 0.30151134457776363, 'DEATH': 0.30151134457776363}
-}
 
-
-def create_decision_tree_files(games, features, create_files=True):
+def create_dataset(games, features):
     """
-    Create the files for the decision tree.
+    Create the dataset of the features on the games, for the decision tree.
     """
     
     features_names = {}
     for feature in features:
         features_names[feature] = f'{feature[0]} of {feature[1]} in time frame {feature[2]}'
 
-    names = {"classes": ["T1", "T2"], "features": list(features_names.values())}
-
-    graphs = importer.get_graphs()
-
-    data = []
-    for game in games:
-        data_to_tree = {"class": "T1"} if game.winner == 'blue' else {"class": "T2"}
-        for feature in features:
-            game_metrics = [graph for graph in graphs if graph["game_id"] == game.game_id][0]
-
-            if feature[2] < len(game_metrics["time_frames"]):
-                metrics = game_metrics["time_frames"][feature[2]]["metrics"]
-            else:
-                metrics = VOID_METRICS
-
-            if feature[0] == 'indeg':
-                data_to_tree[features_names[feature]] = metrics['indeg'][feature[1]]
-            elif feature[0] == 'outdeg':
-                data_to_tree[features_names[feature]] = metrics['outdeg'][feature[1]]
-            elif feature[0] == 'cls':
-                data_to_tree[features_names[feature]] = metrics['cls'][feature[1]]
-            elif feature[0] == 'btw':
-                data_to_tree[features_names[feature]] = metrics['btw'][feature[1]]
-            elif feature[0] == 'eige':
-                data_to_tree[features_names[feature]] = metrics['eige'][feature[1]]
-        
-        data.append(data_to_tree)
+    matrix = importer.get_metric_tensor().gather([game.game_id for game in games], list(features_names))
+    labels = games_labels(games)
 
-    if create_files:
-        importer.write_graphs_files(names, data)
-    
-    return names, data
+    return Dataset(["T1", "T2"], list(features_names.values()), matrix, labels)
         
-def create_decision_tree():
+def create_decision_tree(**parameters):
     """
-    Create the decision tree from the files.
+    Create the decision tree from the exported dataset.
+    The parameters are passed to the C45 tree.
     """
     
-    names, data = importer.get_graphs_files()
+    return create_decision_tree_from_dataset(importer.get_dataset(), **parameters)
 
-    c45 = C45(data, names["classes"], names["features"])
-    c45.generate_tree()
+def create_decision_tree_from_dataset(dataset, **parameters):
+    """
+    Create the decision tree from the given dataset.
+    The parameters are passed to the C45 tree.
+    """
+    
+    c45 = C45(None, dataset.classes, dataset.features, **parameters)
+    c45.generate_tree_from_matrix(dataset.matrix, dataset.labels)
 
     return c45
 
-def create_decision_tree_from_dict(names, data):
+def create_random_forest(games, features, **parameters):
     """
-    Create the decision tree from the given data.
+    Create a random forest of decision trees on the games.
+    The parameters are passed to the RandomForest.
     """
-    
-    c45 = C45(data, names["classes"], names["features"])
-    c45.generate_tree()
+
+    dataset = create_dataset(games, features)
+
+    forest = RandomForest(None, dataset.classes, dataset.features, **parameters)
+    forest.generate_forest_from_matrix(dataset.matrix, dataset.labels)
+
+    return forest
+
+def get_decision_tree(games, features, cache=None, **parameters):
+    """
+    Get the decision tree of the features on the games.
+    The tree is read from the model cache when it has already been trained, and added to it otherwise.
+    The parameters are passed to the C45 tree.
+    """
+
+    cache = cache or ModelCache()
+    key = cache.key(games, features, parameters)
+
+    c45 = cache.get(key)
+    if c45 is None:
+        c45 = create_decision_tree_from_dataset(create_dataset(games, features), **parameters)
+        cache.put(key, c45)
 
     return c45
\ No newline at end of file
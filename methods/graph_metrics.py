@@ -0,0 +1,147 @@
+import logging
+import numpy as np
+
+from classes.metric_tensor import METRICS, NODES
+
+# Number of graphs whose metrics are computed at once, bounding the memory of the betweenness arrays
+BATCH_SIZE = 2048
+
+# Positions of the possible edges in the flattened adjacency matrices: the interactions between the teams and the deaths
+_possible_edges = np.zeros((len(NODES), len(NODES)), dtype=bool)
+_possible_edges[:5, 5:10] = _possible_edges[5:10, :5] = _possible_edges[:10, 10] = True
+EDGES = np.flatnonzero(_possible_edges)
+
+
+log = logging.getLogger(__name__)
+logging.basicConfig(format='[%(name)s] %(asctime)s <%(levelname)s> %(message)s', level=logging.INFO, datefmt='%H:%M:%S')
+
+
+def game_adjacency(game):
+    """
+    Get the adjacency matrices of the interaction graphs of a game, one per time frame, with the nodes in the order of NODES.
+    """
+
+    adjacency = np.zeros((len(game.time_frames), len(NODES), len(NODES)), dtype=bool)
+
+    for time_frame, frame in enumerate(game.time_frames):
+        interactions = np.array(frame.interactions, dtype=bool)
+        adjacency[time_frame, :5, 5:10] = interactions[:, :, 0]
+        adjacency[time_frame, 5:10, :5] = interactions[:, :, 1].T
+        adjacency[time_frame, :10, 10] = np.array(frame.deaths, dtype=bool).reshape(10)
+
+    return adjacency
+
+def edge_bitmasks(adjacency):
+    """
+    Get the integer bitmask of the edges of every adjacency matrix of a stack, with one bit per possible edge of EDGES.
+    """
+
+    bits = adjacency.reshape(len(adjacency), -1)[:, EDGES].astype(np.uint64) << np.arange(len(EDGES), dtype=np.uint64)
+
+    return np.bitwise_or.reduce(bits, axis=1)
+
+def shortest_paths(adjacency):
+    """
+    Get the distances and the numbers of shortest paths between all the pairs of nodes of a stack of adjacency matrices.
+    The walks of length k are counted by the k-th power of the matrices, and the first length reaching a pair is its distance.
+    Unreachable pairs are at an infinite distance.
+    """
+
+    nb_nodes = adjacency.shape[-1]
+    matrix = adjacency.astype(float)
+
+    walks = np.broadcast_to(np.eye(nb_nodes), adjacency.shape).copy()
+    distances = np.where(walks > 0, 0.0, np.inf)
+    paths = walks.copy()
+
+    for length in range(1, nb_nodes):
+        walks = walks @ matrix
+        reached = (walks > 0) & np.isinf(distances)
+        if not reached.any():
+            break
+        distances[reached] = length
+        paths[reached] = walks[reached]
+
+    return distances, paths
+
+def closeness(distances):
+    """
+    Get the closeness centrality of the nodes from the distances, like networkx: over the distances to each node,
+    scaled by the fraction of the nodes reaching it.
+    """
+
+    nb_nodes = distances.shape[-1]
+    reachable = np.isfinite(distances)
+
+    counts = reachable.sum(axis=-2) - 1.0
+    totals = np.where(reachable, distances, 0).sum(axis=-2)
+    centrality = np.divide(counts, totals, out=np.zeros_like(totals), where=totals > 0)
+
+    return centrality * (counts / (nb_nodes - 1))
+
+def betweenness(distances, paths):
+    """
+    Get the normalized betweenness centrality of the nodes from the distances and numbers of shortest paths, like networkx.
+    A node v is on a shortest path from s to t when d(s, v) + d(v, t) = d(s, t), and then carries sigma(s, v) * sigma(v, t) of its sigma(s, t) paths.
+    """
+
+    nb_nodes = distances.shape[-1]
+
+    # Indexed by graph, source, node and target
+    on_path = (distances[:, :, :, None] + distances[:, None, :, :] == distances[:, :, None, :]) & np.isfinite(distances[:, :, None, :])
+    distinct = ~np.eye(nb_nodes, dtype=bool)
+    on_path &= distinct[:, :, None] & distinct[None, :, :] & distinct[:, None, :]
+
+    ratios = paths[:, :, :, None] * paths[:, None, :, :] / np.where(paths > 0, paths, 1)[:, :, None, :]
+    centrality = np.where(on_path, ratios, 0).sum(axis=(1, 3))
+
+    return centrality * (1 / ((nb_nodes - 1) * (nb_nodes - 2)))
+
+def eigenvector(adjacency, max_iter=100000, tol=1e-6):
+    """
+    Get the eigenvector centrality of the nodes like networkx: power iterations on the transposed adjacency plus the identity,
+    from a uniform vector, until the L1 change of a graph is under nb_nodes * tol.
+    """
+
+    nb_nodes = adjacency.shape[-1]
+    matrix = adjacency.transpose(0, 2, 1) + np.eye(nb_nodes)
+
+    centrality = np.full(adjacency.shape[:-1], 1 / nb_nodes)
+    active = np.arange(len(adjacency))
+
+    for _ in range(max_iter):
+        if not len(active):
+            return centrality
+
+        last = centrality[active]
+        x = (matrix[active] @ last[..., None])[..., 0]
+        norm = np.sqrt((x ** 2).sum(axis=-1, keepdims=True))
+        x /= np.where(norm > 0, norm, 1)
+        centrality[active] = x
+
+        active = active[np.abs(x - last).sum(axis=-1) >= nb_nodes * tol]
+
+    if len(active):
+        raise RuntimeError(f'The eigenvector centrality of {len(active)} graphs did not converge in {max_iter} iterations')
+
+    return centrality
+
+def get_metrics_batch(adjacency):
+    """
+    Get the metrics of a stack of adjacency matrices, as an array indexed by graph, metric and node like metrics_to_array.
+    """
+
+    metrics = np.empty((len(adjacency), len(METRICS), adjacency.shape[-1]))
+
+    for start in range(0, len(adjacency), BATCH_SIZE):
+        batch = adjacency[start:start + BATCH_SIZE]
+        distances, paths = shortest_paths(batch)
+
+        # In the order of METRICS
+        metrics[start:start + BATCH_SIZE] = np.stack([batch.sum(axis=1),
+                                                      batch.sum(axis=2),
+                                                      closeness(distances),
+                                                      betweenness(distances, paths),
+                                                      eigenvector(batch)], axis=1)
+
+    return metrics
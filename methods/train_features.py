@@ -1,28 +1,71 @@
+import os
+import gzip
+import time
+import queue
+import pickle
 import random
 import logging
-from math import prod
-from itertools import product
-from multiprocessing import Pool
+import pathlib
+import numpy as np
+from math import prod, ceil
+from multiprocessing import Pool, Process, Queue
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
 
-from classes.utils import chunk_split, accuracy_fix
-from methods.get_tree import create_decision_tree_files, create_decision_tree_from_dict
+from classes.c45 import C45
+import classes.importer as importer
+from classes.utils import accuracy_fix
+from classes.metric_tensor import METRICS, NODES, games_labels
+
+# Number of genomes sent to a fitness worker at once, small enough to keep every worker busy
+FITNESS_CHUNKSIZE = 4
+
+# Read-only metric tensor of the games, attached by each fitness worker
+_fitness_worker = None
 
 
 log = logging.getLogger(__name__)
 logging.basicConfig(format='[%(name)s] %(asctime)s <%(levelname)s> %(message)s', level=logging.INFO, datefmt='%H:%M:%S')
 
 
+class Genome:
+    """
+    The features selected by an individual, stored as the sorted indices of the selected combinations
+    in the product of the feature lists.
+    """
+
+    def __init__(self, length, indices=()):
+        self.length = length
+        self.indices = tuple(sorted(set(indices)))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __eq__(self, other):
+        return isinstance(other, Genome) and self.indices == other.indices
+
+    def __hash__(self):
+        return hash(self.indices)
+
+    def __repr__(self):
+        return f'Genome({list(self.indices)})'
+
 class Individual:
-    def __init__(self, features):
+    def __init__(self, features, genome=None):
         self.features = features
         self.int_length = prod([len(feature) for feature in self.features])
 
-        self.individual = 0
-
-        for _ in range(1):
-            self.individual ^= 1 << random.randint(0, self.int_length - 1)
+        self.genome = genome if genome is not None else Genome(self.int_length, [random.randint(0, self.int_length - 1)])
 
         self.fitness = 0
+        self.fidelity = 0
+
+    def rank(self):
+        """
+        The key the individuals are ranked by: the fidelity stage their fitness was computed at, and then the fitness.
+        """
+
+        return self.fidelity, self.fitness
 
 class Population:
     def __init__(self, size, features):
@@ -37,8 +80,41 @@ class Population:
         r = r[:-2] + "]"
         return r
 
+class FitnessCache:
+    """
+    A least recently used cache of fitness values, keyed by the feature set of the individuals.
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key):
+        if key not in self.values:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.values.move_to_end(key)
+        return self.values[key]
+
+    def put(self, key, value):
+        self.values[key] = value
+        self.values.move_to_end(key)
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+
+    def hit_rate(self):
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0
+
 class GeneticAlgorithm:
-    def __init__(self, games, population_size, features, propagation_rate, crossover_rate, mutation_rate, processes):
+    def __init__(self, games, population_size, features, propagation_rate, crossover_rate, mutation_rate, processes, tree_parameters=None, cache_size=100000, fidelities=None,
+                 gains=None, gain_bias=False, gain_floor=None):
         self.games = games
         self.features = features
         self.population_size = population_size
@@ -47,161 +123,524 @@ class GeneticAlgorithm:
         self.mutation_rate = mutation_rate
         
         self.processes = processes
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        self.tree_parameters = tree_parameters or {}
+        self.cache = FitnessCache(cache_size)
+        # Stages of (fraction of the games, fraction of the individuals promoted) before the evaluation on all the games
+        self.fidelities = fidelities or []
+        # Information gain of every feature, to draw the informative ones more often and skip the feature sets below the floor
+        self.gains = gains
+        self.gain_floor = gain_floor
+        self.gain_weights = None
+        # Without any informative feature, e.g. on games of a single class, the draws stay uniform
+        if gain_bias and gains.sum() > 0:
+            # Half of the draws follow the gains, the other half stays uniform so that no feature is out of reach
+            self.gain_weights = (gains + gains.mean()) / (2 * gains.sum())
+
+        self.pool = None
+        self.shared_tensor = None
+        self.ranked_population = []
 
         self.population = Population(self.population_size, self.features)
+        if self.gain_weights is not None:
+            length = prod([len(feature) for feature in self.features])
+            for individual, index in zip(self.population.population, self.rng.choice(length, size=self.population_size, p=self.gain_weights)):
+                individual.genome = Genome(length, [index])
 
-    def get_features(self, individual, selected_features_index=[], selected_features=[]):
-        if len(selected_features_index) == len(self.features):
-            shift = 0
-            for index, s_feature in enumerate(reversed(selected_features_index)):
-                reversed_index = len(selected_features_index) - index - 1
-                fixed_features = self.features + [[0]]
-                last_lengths = [len(feature) for feature in fixed_features[reversed_index+1:]]
-                shift += s_feature * prod(last_lengths)
-
-            if individual.individual & (1 << shift):
-                return selected_features
-            
-            return None
-        
-        features = []
-
-        for index, _ in enumerate(self.features[len(selected_features_index)]):
-            value = self.get_features(individual, selected_features_index + [index], selected_features + [self.features[len(selected_features_index)][index]])
-            if value and type(value[0]) != list:
-                features.append(value)
-            elif value:
-                features += value
-
-        return features
+    def get_features(self, individual):
+        return _decode_features(individual.genome.indices, self.features)
     
     def set_features(self, features):
-        int = 0
+        indices = []
+
+        for feature in features:
+            index = 0
+            for values, value in zip(self.features, feature):
+                index = index * len(values) + values.index(value)
+            indices.append(index)
+
+        return Genome(prod([len(feature) for feature in self.features]), indices)
+
+    def start_workers(self):
+        """
+        Start the pool of fitness workers, sharing the metric tensor of the games through shared memory.
+        """
+
+        self.shared_tensor, shape, labels = _share_games(self.games)
+
+        args = (self.shared_tensor.name, shape, labels, self.features, self.tree_parameters)
+        self.pool = Pool(processes=self.processes, initializer=_init_fitness_worker, initargs=args)
+
+    def stop_workers(self):
+        """
+        Stop the pool of fitness workers and free the shared metric tensor.
+        """
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        if self.shared_tensor is not None:
+            self.shared_tensor.close()
+            self.shared_tensor.unlink()
+            self.shared_tensor = None
+
+    def fitness(self):
+        """
+        Compute the fitness of the population. With fidelities, the new feature sets are first scored on random subsamples of the games,
+        and only the best ones of every stage are promoted to the next one, up to the full score on all the games.
+        """
+
+        # An island evaluates serially, on the metric tensor its process attached with _init_fitness_worker
+        if self.pool is None and _fitness_worker is None:
+            self.start_workers()
+
+        # Only the individuals with a feature set neither cached nor already pending are sent to the workers
+        pending = {}
+        for individual in self.population.population:
+            if individual.genome in pending:
+                pending[individual.genome].append(individual)
+                self.cache.hits += 1
+                continue
+
+            fitness = self.cache.get(individual.genome)
+            if fitness is None:
+                pending[individual.genome] = [individual]
+            else:
+                individual.fitness = fitness
+                individual.fidelity = len(self.fidelities)
+
+        # The feature sets with only uninformative features are ranked below every evaluated individual without building their tree
+        if self.gain_floor is not None:
+            hopeless = [genome for genome in pending if np.all(self.gains[list(genome.indices)] < self.gain_floor)]
+            for genome in hopeless:
+                for individual in pending.pop(genome):
+                    individual.fitness = 0
+                    individual.fidelity = -1
+            if hopeless:
+                log.info(f'{len(hopeless)} feature sets below the gain floor skipped')
+
+        genomes = list(pending)
+        for stage, (fraction, promotion) in enumerate(self.fidelities):
+            if not genomes:
+                break
+
+            rows = np.sort(self.rng.choice(len(self.games), size=max(1, round(fraction * len(self.games))), replace=False))
+            scores = self.evaluate(genomes, rows)
+            for genome, score in zip(genomes, scores):
+                for individual in pending[genome]:
+                    individual.fitness = score
+                    individual.fidelity = stage
+
+            promoted = sorted(range(len(genomes)), key=lambda i: scores[i], reverse=True)[:max(1, ceil(len(genomes) * promotion))]
+            log.info(f'Fidelity {stage+1}: {len(genomes)} scored on {len(rows)} games, {len(promoted)} promoted')
+            genomes = [genomes[i] for i in promoted]
+
+        for genome, fitness in zip(genomes, self.evaluate(genomes)):
+            self.cache.put(genome, fitness)
+            for individual in pending[genome]:
+                individual.fitness = fitness
+                individual.fidelity = len(self.fidelities)
+
+    def evaluate(self, genomes, rows=None):
+        """
+        Return the fitness of the genomes, on the given rows of the games or on all of them.
+        """
+
+        tasks = [(i, genome.indices, rows) for i, genome in enumerate(genomes)]
+        if self.pool is not None:
+            results = self.pool.imap_unordered(_genome_fitness, tasks, chunksize=FITNESS_CHUNKSIZE)
+        else:
+            results = map(_genome_fitness, tasks)
 
-        reversed_features = [reversed(feature) for feature in self.features]
+        fitnesses = [0] * len(genomes)
+        t0 = time.perf_counter()
+        for done, (i, fitness) in enumerate(results, 1):
+            fitnesses[i] = fitness
 
-        for i in product(*reversed_features):
-            if list(i) in features:
-                int = (int << 1) | 1
-            else:
-                int = int << 1
-
-        return int
-
-    def threaded_fitness(self, args):
-        id = args[0]
-        log.info(f'Process {id} started')
-        args = args[1]
-        computed_values = {}
-        for i, individual in args:
-            if (i+1) % 100 == 0:
-                log.info(f'{i+1}/{self.population_size}')
-            raw_features = self.get_features(individual)
-            features = []
-            for feature in raw_features:
-                if feature[1] == 10:
-                    features.append((feature[0], f'DEATH', feature[2]))
-                else:
-                    player = ['T1-R1', 'T1-R2', 'T1-R3', 'T1-R4', 'T1-R5', 'T2-R1', 'T2-R2', 'T2-R3', 'T2-R4', 'T2-R5'][feature[1]]
-                    features.append((feature[0], player, feature[2]))
-
-            names, data = create_decision_tree_files(self.games, features, False)
-            tree = create_decision_tree_from_dict(names, data)
-            accuracy = tree.get_accuracy() - accuracy_fix(features)
-            computed_values[individual] = (id, i, accuracy)
-
-        return computed_values
-
-    def fitness(self, processes=12):
-        args = list(enumerate(self.population.population))
-
-        with Pool(processes=processes) as pool:
-            results = pool.map(self.threaded_fitness, [(i, chunk) for i, chunk in enumerate(chunk_split(args, processes))], chunksize=1)
-            pool.close()
-
-        args = [(i, chunk) for i, chunk in enumerate(chunk_split(args, processes))]
-        for result in results:
-            for _, accuracy in result.items():
-                for i, individual in args[accuracy[0]][1]:
-                    if i == accuracy[1]:
-                        individual.fitness = accuracy[2]
-                        break
+            if done % 100 == 0 or done == len(tasks):
+                log.info(f'{done}/{len(tasks)} evaluated, {done / (time.perf_counter() - t0):.1f} individuals/s')
+
+        return fitnesses
 
     def rank_selection(self):
-        ranked_population = sorted(self.population.population, key=lambda ind: ind.fitness, reverse=True)[2:]
+        ranked_population = sorted(self.population.population, key=lambda ind: ind.rank(), reverse=True)[2:]
         selection_probabilities = list(reversed([i / len(ranked_population) for i in range(1, len(ranked_population) + 1)]))
 
         selected = random.choices(ranked_population, weights=selection_probabilities, k=round(len(ranked_population)*self.propagation_rate))
 
         return selected
     
-    def crossover(self, parent1, parent2):
-        child1 = Individual(self.features)
-        child2 = Individual(self.features)
+    def genome_matrix(self, individuals):
+        """
+        Return the genomes of the individuals as a boolean matrix, with one row per individual and one column per feature.
+        """
 
-        point1, point2 = random.randint(0, child1.int_length - 1), random.randint(0, child1.int_length - 1)
-        if point1 > point2:
-            point1, point2 = point2, point1
+        matrix = np.zeros((len(individuals), prod([len(feature) for feature in self.features])), dtype=bool)
+        lengths = [len(individual.genome) for individual in individuals]
+        columns = [index for individual in individuals for index in individual.genome.indices]
+        matrix[np.repeat(np.arange(len(individuals)), lengths), columns] = True
 
-        outer_mask = ((1 << point1) - 1) << (parent1.int_length - point1) | ((1 << (parent1.int_length - point2)) - 1)
-        inner_mask = ((1 << point2 - point1) - 1) << (parent1.int_length - point2)
+        return matrix
 
-        if random.random() < self.crossover_rate:
-            child1.individual = (parent1.individual & outer_mask) | (parent2.individual & inner_mask)
-            child2.individual = (parent2.individual & outer_mask) | (parent1.individual & inner_mask)
-        else:
-            child1.individual = parent1.individual
-            child2.individual = parent2.individual
+    def individuals_from_matrix(self, matrix):
+        """
+        Return the individuals of the rows of a genome matrix.
+        """
 
-        return child1, child2
+        rows, columns = np.nonzero(matrix)
+        splits = np.cumsum(np.bincount(rows, minlength=len(matrix)))[:-1]
+
+        return [Individual(self.features, Genome(matrix.shape[1], indices.tolist())) for indices in np.split(columns, splits)]
+
+    def crossover(self, parents1, parents2):
+        """
+        Two-point crossover of every pair of parents at once, on their genome matrices.
+        Returns the genome matrix of the children, the first children of every pair and then the second ones.
+        """
+
+        matrix1, matrix2 = self.genome_matrix(parents1), self.genome_matrix(parents2)
+        length = matrix1.shape[1]
+
+        points = np.sort(self.rng.integers(0, length, size=(len(parents1), 2)), axis=1)
+        columns = np.arange(length)
+        # Crossover points are counted from the last column, like the crossover on integer bitsets used to
+        inner = (columns >= length - points[:, 1:]) & (columns < length - points[:, :1])
+        inner &= (self.rng.random(len(parents1)) < self.crossover_rate)[:, None]
+
+        return np.concatenate([np.where(inner, matrix2, matrix1), np.where(inner, matrix1, matrix2)])
     
-    def mutation(self, children):
-        for child in children:
-            for i in range(child.int_length):
-                if random.random() < self.mutation_rate:
-                    child.individual ^= 1 << i
-        return children
+    def mutation(self, matrix):
+        """
+        Flip every bit of the genome matrix with the mutation rate, drawing the number of flips of every row
+        from a binomial distribution and only then their positions, biased toward the informative features with gain_bias.
+        """
+
+        flips = self.rng.binomial(matrix.shape[1], self.mutation_rate, size=len(matrix))
+        rows = np.repeat(np.arange(len(matrix)), flips)
+        if self.gain_weights is None:
+            columns = self.rng.integers(0, matrix.shape[1], size=len(rows))
+        else:
+            columns = self.rng.choice(matrix.shape[1], size=len(rows), p=self.gain_weights)
+        matrix[rows, columns] ^= True
+
+        return matrix
     
+    def save_checkpoint(self, path, generation, curves):
+        """
+        Save the population, its fitnesses, the random states, the fitness cache and the curves after a generation.
+        The file is written next to the checkpoint and then renamed, so an interruption never leaves a broken checkpoint.
+        """
+
+        checkpoint = {
+            'generation': generation,
+            'key': importer.get_games_key(self.games, self.features, tree_parameters=self.tree_parameters),
+            'population': [individual.genome.indices for individual in self.population.population],
+            'fitnesses': [individual.fitness for individual in self.population.population],
+            'random_state': random.getstate(),
+            'rng_state': self.rng.bit_generator.state,
+            'cache': [(genome.indices, fitness) for genome, fitness in self.cache.values.items()],
+            'curves': curves
+        }
+
+        temporary_path = path.with_name(path.name + '.tmp')
+        with gzip.open(temporary_path, 'wb') as file:
+            pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def load_checkpoint(self, path):
+        """
+        Restore the state saved by save_checkpoint, and return the number of completed generations and the curves.
+        """
+
+        with gzip.open(path, 'rb') as file:
+            checkpoint = pickle.load(file)
+
+        # The cached fitnesses only hold for the same games, metrics, features and tree parameters
+        if checkpoint['key'] != importer.get_games_key(self.games, self.features, tree_parameters=self.tree_parameters):
+            raise ValueError(f'The checkpoint {path} was made with other games, metrics, features or tree parameters')
+
+        length = prod([len(feature) for feature in self.features])
+        self.population.population = []
+        for indices, fitness in zip(checkpoint['population'], checkpoint['fitnesses']):
+            individual = Individual(self.features, Genome(length, indices))
+            individual.fitness = fitness
+            self.population.population.append(individual)
+
+        random.setstate(checkpoint['random_state'])
+        self.rng.bit_generator.state = checkpoint['rng_state']
+        for indices, fitness in checkpoint['cache']:
+            self.cache.put(Genome(length, indices), fitness)
+
+        return checkpoint['generation'], checkpoint['curves']
+
+    def emigrants(self, count):
+        """
+        Return the genomes, fitnesses and fidelities of the best individuals of the last evaluated population.
+        """
+
+        return [(individual.genome.indices, individual.fitness, individual.fidelity) for individual in self.ranked_population[:count]]
+
+    def immigrate(self, migrants):
+        """
+        Replace the last children of the population with the migrants of another island, caching their fitness when it is a full score.
+        """
+
+        length = prod([len(feature) for feature in self.features])
+        for i, (indices, fitness, fidelity) in enumerate(migrants, 1):
+            genome = Genome(length, indices)
+            if fidelity == len(self.fidelities):
+                self.cache.put(genome, fitness)
+            self.population.population[-i] = Individual(self.features, genome)
+
     def next_generation(self):
-        self.fitness(self.processes)
+        hits, lookups = self.cache.hits, self.cache.hits + self.cache.misses
+        self.fitness()
+        hits, lookups = self.cache.hits - hits, self.cache.hits + self.cache.misses - lookups
 
-        max_ind = max(self.population.population, key=lambda ind: ind.fitness)
+        max_ind = max(self.population.population, key=lambda ind: ind.rank())
         max_features = self.get_features(max_ind)
         max_fitness = max_ind.fitness
         true_max_fitness = max_fitness + accuracy_fix(max_features)
-        min_fitness = min(self.population.population, key=lambda ind: ind.fitness).fitness
-        avg_fitness = sum([ind.fitness for ind in self.population.population]) / len(self.population.population)
+        # Only the full scores are comparable: the subsample scores are on fewer games, and the feature sets below the gain floor have no score
+        scored = [ind for ind in self.population.population if ind.fidelity == len(self.fidelities)] or self.population.population
+        min_fitness = min(scored, key=lambda ind: ind.fitness).fitness
+        avg_fitness = sum([ind.fitness for ind in scored]) / len(scored)
         log.info(f'Max: {max_fitness}, Min: {min_fitness}, Avg: {avg_fitness}, True Max: {true_max_fitness}')
-        log.info(f'Max features: {self.get_features(max(self.population.population, key=lambda ind: ind.fitness))}')
+        log.info(f'Max features: {max_features}')
+        log.info(f'Fitness cache: {hits}/{lookups} hits ({hits / lookups:.1%}), {self.cache.hit_rate():.1%} overall, {len(self.cache)} entries')
 
         selected = self.rank_selection()
 
-        ranked_population = sorted(self.population.population, key=lambda ind: ind.fitness, reverse=True)
+        ranked_population = sorted(self.population.population, key=lambda ind: ind.rank(), reverse=True)
+        self.ranked_population = ranked_population
         new_population = [ranked_population[0], ranked_population[1]]
-        while len(new_population) < self.population_size:
-            children = self.crossover(random.choice(selected), random.choice(selected))
-            children = self.mutation(children)
-            new_population += children
+        pairs = (self.population_size - len(new_population) + 1) // 2
+        children = self.mutation(self.crossover(random.choices(selected, k=pairs), random.choices(selected, k=pairs)))
+        new_population += self.individuals_from_matrix(children)
         
         self.population.population = new_population
 
         return max_fitness, min_fitness, avg_fitness, true_max_fitness     
     
 
-def train_features(games, pop_size, generations, features, propagation_rate=0.8, crossover_rate=0.8, mutation_rate=0.0005, processes=12):
-    genetic_algorithm = GeneticAlgorithm(games, pop_size, features, propagation_rate, crossover_rate, mutation_rate, processes)
+def train_features(games, pop_size, generations, features, propagation_rate=0.8, crossover_rate=0.8, mutation_rate=0.0005, processes=12, tree_parameters=None, cache_size=100000,
+                   checkpoint_path=None, checkpoint_every=1, resume=False, fidelities=None, gain_bias=False, gain_floor=None):
+    """
+    Train the features with the genetic algorithm, and return the curves of the max, average and true max fitness.
+    With a checkpoint_path, the state is saved every checkpoint_every generations, and resume restarts from the last saved generation.
+    With fidelities, e.g. [(0.2, 0.5), (0.5, 0.5)], the new individuals are scored on growing subsamples of the games,
+    only the promoted fraction of every stage reaching the next one and the full score.
+    With gain_bias, the initial population and the mutations favor the features with a high information gain,
+    and with a gain_floor, the feature sets with only features below it are skipped.
+    """
+
+    gains = get_gain_table(games, features) if gain_bias or gain_floor is not None else None
+    genetic_algorithm = GeneticAlgorithm(games, pop_size, features, propagation_rate, crossover_rate, mutation_rate, processes, tree_parameters, cache_size, fidelities,
+                                         gains, gain_bias, gain_floor)
 
-    # i = genetic_algorithm.set_features([['outdeg', 0, 12], ['outdeg', 4, 11], ['cls', 8, 2], ['btw', 9, 8], ['eige', 10, 9]])
-    # genetic_algorithm.population.population[0].individual = i
+    # genome = genetic_algorithm.set_features([['outdeg', 0, 12], ['outdeg', 4, 11], ['cls', 8, 2], ['btw', 9, 8], ['eige', 10, 9]])
+    # genetic_algorithm.population.population[0].genome = genome
+
+    maxes = []
+    avgs = []
+    true_maxes = []
+    start = 0
+
+    if checkpoint_path is not None:
+        checkpoint_path = pathlib.Path(checkpoint_path)
+        if resume and checkpoint_path.exists():
+            start, (maxes, avgs, true_maxes) = genetic_algorithm.load_checkpoint(checkpoint_path)
+            log.info(f'Resuming from generation {start}')
+
+    genetic_algorithm.start_workers()
+    try:
+        for i in range(start, generations):
+            log.info(f'Generation {i+1}')
+            ma, mi, av, tma = genetic_algorithm.next_generation()
+            maxes.append(ma)
+            avgs.append(av)
+            true_maxes.append(tma)
+
+            if checkpoint_path is not None and ((i + 1) % checkpoint_every == 0 or i + 1 == generations):
+                genetic_algorithm.save_checkpoint(checkpoint_path, i + 1, (maxes, avgs, true_maxes))
+    finally:
+        genetic_algorithm.stop_workers()
+
+    return maxes, avgs, true_maxes
+
+
+def train_features_islands(games, pop_size, generations, features, islands=4, migration_interval=5, migrants=2, propagation_rate=0.8, crossover_rate=0.8, mutation_rate=0.0005,
+                           tree_parameters=None, cache_size=100000, fidelities=None, gain_bias=False, gain_floor=None):
+    """
+    Train the features with one genetic algorithm of pop_size individuals per island, every island evolving in its own process.
+    Every migration_interval generations, the best migrants of every island replace the last children of the next island in the ring.
+    Returns the curves of the max, average and true max fitness over all the islands.
+    """
+
+    tree_parameters = tree_parameters or {}
+    gains = get_gain_table(games, features) if gain_bias or gain_floor is not None else None
+    shared_tensor, shape, labels = _share_games(games)
+    inboxes = [Queue() for _ in range(islands)]
+    results = Queue()
+
+    processes = []
+    for island in range(islands):
+        args = (island, games, (shared_tensor.name, shape, labels, features, tree_parameters), random.getrandbits(64), pop_size, generations, features,
+                propagation_rate, crossover_rate, mutation_rate, cache_size, fidelities, (gains, gain_bias, gain_floor), migration_interval, migrants, inboxes[island], inboxes[(island + 1) % islands], results)
+        processes.append(Process(target=_run_island, args=args))
+
+    curves = {}
+    try:
+        for process in processes:
+            process.start()
+
+        while len(curves) < islands:
+            try:
+                island, island_curves = results.get(timeout=1)
+                curves[island] = island_curves
+            except queue.Empty:
+                if any(process.exitcode for process in processes):
+                    raise RuntimeError('An island of the genetic algorithm failed')
+
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shared_tensor.close()
+        shared_tensor.unlink()
+
+    maxes = []
+    avgs = []
+    true_maxes = []
+    for generation in range(generations):
+        best = max(curves.values(), key=lambda island_curves: island_curves[0][generation])
+        maxes.append(best[0][generation])
+        avgs.append(sum([island_curves[1][generation] for island_curves in curves.values()]) / islands)
+        true_maxes.append(best[2][generation])
+
+    return maxes, avgs, true_maxes
+
+
+def get_gain_table(games, features):
+    """
+    Get the best information gain of a single split on every feature of the product of the feature lists, indexed like the genomes.
+    The table is computed once for the games and features, and then read from the graph_data folder.
+    """
+
+    key = importer.get_games_key(games, features)
+    gains = importer.get_gains(key)
+    if gains is not None:
+        return gains
+
+    t0 = time.perf_counter()
+    tensor, labels = _games_tensor(games)
+
+    decoded = _decode_features(range(prod([len(values) for values in features])), features)
+    metrics = np.array([METRICS.index(metric) for metric, _, _ in decoded])
+    nodes = np.array([node for _, node, _ in decoded])
+    time_frames = np.minimum([time_frame for _, _, time_frame in decoded], tensor.shape[1] - 1)
+
+    gains = C45(None, ["T1", "T2"], []).feature_gains(tensor[:, time_frames, metrics, nodes], labels)
+    importer.write_gains(key, gains)
+    log.info(f'Information gain table of {len(gains)} features computed in {time.perf_counter() - t0:.2f}s')
+
+    return gains
+
+def _decode_features(indices, features):
+    """
+    Decode the indices of a genome into their [metric, node, time frame] features: an index is a position in the product of the
+    feature lists, written in mixed radix with the time frames as the last digit.
+    """
+
+    positions = np.unravel_index(np.asarray(indices, dtype=np.intp), [len(values) for values in features])
+
+    return [[values[position] for values, position in zip(features, feature)] for feature in zip(*(p.tolist() for p in positions))]
+
+def _games_tensor(games):
+    """
+    Returns the dense metric tensor of the games and their labels.
+    """
+
+    return importer.get_metric_tensor().dense([game.game_id for game in games]), games_labels(games)
+
+def _share_games(games):
+    """
+    Copy the metric tensor of the games to shared memory, and return it with its shape and the labels of the games.
+    """
+
+    tensor, labels = _games_tensor(games)
+
+    shared_tensor = SharedMemory(create=True, size=tensor.nbytes)
+    np.ndarray(tensor.shape, dtype=tensor.dtype, buffer=shared_tensor.buf)[:] = tensor
+
+    return shared_tensor, tensor.shape, labels
+
+def _run_island(island, games, worker_args, seed, pop_size, generations, features, propagation_rate, crossover_rate, mutation_rate, cache_size, fidelities, gain_args,
+                migration_interval, migrants, inbox, outbox, results):
+    """
+    Evolve the population of an island, sending its migrants to the next island and receiving the ones of the previous island.
+    Puts the curves of the island in the results queue.
+    """
+
+    random.seed(seed)
+    _init_fitness_worker(*worker_args)
+    genetic_algorithm = GeneticAlgorithm(games, pop_size, features, propagation_rate, crossover_rate, mutation_rate, 0, worker_args[4], cache_size, fidelities, *gain_args)
 
     maxes = []
     avgs = []
     true_maxes = []
     for i in range(generations):
-        log.info(f'Generation {i+1}')
+        log.info(f'Island {island}, generation {i+1}')
         ma, mi, av, tma = genetic_algorithm.next_generation()
         maxes.append(ma)
         avgs.append(av)
         true_maxes.append(tma)
 
-    return maxes, avgs, true_maxes
\ No newline at end of file
+        if (i + 1) % migration_interval == 0 and i + 1 < generations:
+            outbox.put(genetic_algorithm.emigrants(migrants))
+            genetic_algorithm.immigrate(inbox.get())
+
+    results.put((island, (maxes, avgs, true_maxes)))
+
+
+def _init_fitness_worker(tensor_name, shape, labels, features, tree_parameters):
+    """
+    Attach a fitness worker to the shared metric tensor of the games.
+    """
+
+    global _fitness_worker
+
+    shared_tensor = SharedMemory(name=tensor_name)
+    tensor = np.ndarray(shape, dtype=float, buffer=shared_tensor.buf)
+    # Every worker reads the same memory, none of them may write to it
+    tensor.flags.writeable = False
+    _fitness_worker = (shared_tensor, tensor, labels, features, tree_parameters)
+
+def _genome_fitness(args):
+    """
+    Compute the fitness of a genome: the accuracy of its decision tree, minus the fix for its number of features.
+    With rows, the tree is only trained on that subsample of the games. Returns the index of the task with the fitness.
+    """
+
+    task, indices, rows = args
+    _, tensor, labels, features, tree_parameters = _fitness_worker
+
+    metrics, nodes, time_frames, names = [], [], [], []
+    for metric, node, time_frame in _decode_features(indices, features):
+        metrics.append(METRICS.index(metric))
+        nodes.append(node)
+        time_frames.append(min(time_frame, tensor.shape[1] - 1))
+        names.append(f'{metric} of {NODES[node]} in time frame {time_frame}')
+
+    tree = C45(None, ["T1", "T2"], names, **tree_parameters)
+    if rows is None:
+        tree.generate_tree_from_matrix(tensor[:, time_frames, metrics, nodes], labels)
+    else:
+        tree.generate_tree_from_matrix(tensor[rows[:, None], time_frames, metrics, nodes], labels[rows])
+
+    # The subsamples are scored with the same objective as the full data, so that the stages promote what the final score rewards
+    return task, tree.get_accuracy() - accuracy_fix(names)
\ No newline at end of file